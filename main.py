@@ -1,18 +1,52 @@
 """
 Entry point of the NeuroDraw application.
 This file initializes and starts the application.
+
+A loading screen is painted first; the main window (and everything it
+imports) is loaded afterwards, and the network is trained in the background.
+Run with --startup-report to print startup and import timings.
 """
 
 import sys
-from PyQt5.QtWidgets import QApplication
-from src.ui.main_window import DigitRecognitionApp
+from src.utils import startup
+
+def show_main_window(loading):
+    """Import and show the main window once the loading screen is on screen"""
+    from src.ui.main_window import DigitRecognitionApp
+    startup.mark("Main window imported")
+
+    window = DigitRecognitionApp()
+    window.showFullScreen()
+    loading.close()
+    startup.mark("Main window shown")
+
+    window.start_training()
+    return window
 
 def main():
     """Main function to start the application"""
+    if "--startup-report" in sys.argv:
+        sys.argv.remove("--startup-report")
+        startup.enable()
+
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import Qt, QTimer
+    from src.ui.components.loading_screen import LoadingScreen
+    startup.mark("Qt imported")
+
     app = QApplication(sys.argv)
-    window = DigitRecognitionApp()
-    window.show()
+    windows = []  # Keeps the main window alive
+
+    loading = LoadingScreen()
+    loading.painted.connect(lambda: startup.mark("Loading screen painted"))
+    # Queued so the loading frame reaches the screen before the heavy imports
+    loading.painted.connect(
+        lambda: QTimer.singleShot(0, lambda: windows.append(show_main_window(loading))),
+        Qt.QueuedConnection
+    )
+    loading.showFullScreen()
+
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
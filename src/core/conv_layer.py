@@ -0,0 +1,180 @@
+"""
+Convolution + pooling layer for SimpleNeuralNetwork.
+Images are kept channels-last, (n, height, width, channels). The
+convolution is computed with im2col: an as_strided view exposes every
+kernel-sized patch, so forward and backward are each one matrix product
+per batch, with no Python loop over pixels.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# Shape of the network input images (height, width, channels)
+INPUT_SHAPE = (28, 28, 1)
+
+
+def im2col(x, kernel_size):
+    """
+    Patches of a batch (n, H, W, C) for a valid convolution with stride 1,
+    as a (k * k * C, n * H' * W') matrix (H' = H - k + 1). Each row is one
+    kernel tap over all output positions, so the copy out of the strided
+    view runs along contiguous image rows.
+    """
+    x = np.ascontiguousarray(x)
+    n, height, width, channels = x.shape
+    out_h = height - kernel_size + 1
+    out_w = width - kernel_size + 1
+    sn, sh, sw, sc = x.strides
+    patches = as_strided(
+        x,
+        shape=(kernel_size, kernel_size, channels, n, out_h, out_w),
+        strides=(sh, sw, sc, sn, sh, sw),
+        writeable=False
+    )
+    return patches.reshape(kernel_size * kernel_size * channels, n * out_h * out_w)
+
+
+class ConvPoolLayer:
+    """
+    Valid 2D convolution (stride 1) -> ReLU -> non-overlapping max pooling.
+    kernels has shape (k, k, in_channels, filters), bias (filters,).
+    """
+    def __init__(self, kernels, bias, pool_size=2):
+        self.kernels = kernels
+        self.bias = bias
+        self.pool_size = int(pool_size)
+        self.kernel_size, _, self.in_channels, self.filters = kernels.shape
+
+    @classmethod
+    def create(cls, in_channels, filters=8, kernel_size=5, pool_size=2):
+        """New layer with He-initialized kernels"""
+        fan_in = kernel_size * kernel_size * in_channels
+        kernels = (np.random.randn(kernel_size, kernel_size, in_channels, filters)
+                   * np.sqrt(2.0 / fan_in)).astype(np.float32)
+        return cls(kernels, np.zeros(filters, dtype=np.float32), pool_size)
+
+    def frozen(self):
+        """Read-only copy (for snapshots)"""
+        kernels = np.array(self.kernels, copy=True)
+        bias = np.array(self.bias, copy=True)
+        kernels.flags.writeable = False
+        bias.flags.writeable = False
+        return ConvPoolLayer(kernels, bias, self.pool_size)
+
+    def copy(self):
+        """Writable copy (for training)"""
+        return ConvPoolLayer(self.kernels.copy(), self.bias.copy(), self.pool_size)
+
+    def output_shape(self, input_shape):
+        """(height, width, filters) produced from an input (height, width, channels)"""
+        height, width, _ = input_shape
+        conv_h = height - self.kernel_size + 1
+        conv_w = width - self.kernel_size + 1
+        return conv_h // self.pool_size, conv_w // self.pool_size, self.filters
+
+    def forward(self, x, keep_cache=False):
+        """
+        Output (n, H'', W'', filters) for a batch (n, H, W, C).
+        With keep_cache, also returns what backward() needs.
+        """
+        n, height, width, _ = x.shape
+        k, p = self.kernel_size, self.pool_size
+        conv_h, conv_w = height - k + 1, width - k + 1
+        pool_h, pool_w = conv_h // p, conv_w // p
+
+        cols = im2col(x, k)
+        weights = self.kernels.reshape(-1, self.filters)
+        conv = np.dot(cols.T, weights) + self.bias
+        activations = np.maximum(conv, 0).reshape(n, conv_h, conv_w, self.filters)
+
+        # Max pooling over p x p blocks (edge rows/columns that do not fill a block
+        # are dropped), as a maximum of p * p strided slices
+        activations = activations[:, :pool_h * p, :pool_w * p]
+        pooled = activations[:, 0::p, 0::p].copy()
+        for i in range(p):
+            for j in range(p):
+                if i or j:
+                    np.maximum(pooled, activations[:, i::p, j::p], out=pooled)
+        if not keep_cache:
+            return pooled
+        return pooled, (x.shape, cols, conv, activations, pooled)
+
+    def backward(self, delta, cache, input_delta=True):
+        """
+        Propagate `delta` (same shape as the output) back through the layer.
+        Returns (kernels delta, bias delta, input delta or None).
+        """
+        input_shape, cols, conv, activations, pooled = cache
+        n, height, width, channels = input_shape
+        k, p = self.kernel_size, self.pool_size
+        conv_h, conv_w = height - k + 1, width - k + 1
+
+        # Pooling: the delta goes to the maximum of each block
+        conv_delta = np.zeros((n, conv_h, conv_w, self.filters), dtype=delta.dtype)
+        for i in range(p):
+            for j in range(p):
+                is_max = activations[:, i::p, j::p] == pooled
+                conv_delta[:, i:pooled.shape[1] * p:p, j:pooled.shape[2] * p:p] = is_max * delta
+
+        # ReLU
+        conv_delta = conv_delta.reshape(-1, self.filters) * (conv > 0)
+
+        kernels_delta = np.dot(cols, conv_delta).reshape(self.kernels.shape)
+        bias_delta = conv_delta.sum(axis=0)
+        if not input_delta:
+            return kernels_delta, bias_delta, None
+
+        # col2im: add every patch's delta back to the pixels it came from
+        # (one slice per kernel offset, not per pixel)
+        cols_delta = np.dot(self.kernels.reshape(-1, self.filters), conv_delta.T)
+        cols_delta = np.moveaxis(cols_delta.reshape(k, k, channels, n, conv_h, conv_w), 2, -1)
+        x_delta = np.zeros(input_shape, dtype=cols_delta.dtype)
+        for i in range(k):
+            for j in range(k):
+                x_delta[:, i:i + conv_h, j:j + conv_w] += cols_delta[i, j]
+        return kernels_delta, bias_delta, x_delta
+
+
+def create_layers(specs, input_shape=INPUT_SHAPE):
+    """Layers from config specs ({"filters", "kernel_size", "pool_size"}); returns (layers, output shape)"""
+    layers = []
+    shape = input_shape
+    for spec in specs:
+        layer = ConvPoolLayer.create(shape[2], spec.get("filters", 8),
+                                     spec.get("kernel_size", 5), spec.get("pool_size", 2))
+        shape = layer.output_shape(shape)
+        if min(shape[:2]) < 1:
+            raise ValueError(f"Convolution layers {specs} are too large for {input_shape} images")
+        layers.append(layer)
+    return layers, shape
+
+
+def run_layers(layers, x):
+    """Outputs of every layer for a batch of flattened or 2D images"""
+    x = np.asarray(x, dtype=np.float32).reshape((len(x),) + INPUT_SHAPE)
+    outputs = []
+    for layer in layers:
+        x = layer.forward(x)
+        outputs.append(x)
+    return outputs
+
+
+def layers_to_parameters(layers):
+    """Flat dict of arrays (np.savez-compatible) describing the layers"""
+    parameters = {}
+    for i, layer in enumerate(layers):
+        parameters[f"conv{i}_kernels"] = np.array(layer.kernels)
+        parameters[f"conv{i}_bias"] = np.array(layer.bias)
+        parameters[f"conv{i}_pool_size"] = np.array(layer.pool_size)
+    return parameters
+
+
+def layers_from_parameters(parameters):
+    """Inverse of layers_to_parameters (writable copies)"""
+    layers = []
+    while f"conv{len(layers)}_kernels" in parameters:
+        i = len(layers)
+        layers.append(ConvPoolLayer(np.array(parameters[f"conv{i}_kernels"], dtype=np.float32),
+                                    np.array(parameters[f"conv{i}_bias"], dtype=np.float32),
+                                    int(parameters[f"conv{i}_pool_size"])))
+    return layers
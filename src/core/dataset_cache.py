@@ -0,0 +1,120 @@
+"""
+Binary cache of the IDX dataset splits.
+The first load converts each split to uint8 .npy files that later loads
+map with np.load(mmap_mode='r') instead of parsing the IDX files again.
+"""
+
+import gzip
+import json
+import os
+import struct
+import numpy as np
+
+# Bump when the cache layout changes so old caches are rebuilt
+CACHE_VERSION = 1
+
+# Images copied from the IDX stream into the cache per read
+CHUNK_IMAGES = 4096
+
+
+def open_idx(filename):
+    """Open an IDX file, decompressing it on the fly if it is gzipped"""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, 'rb')
+    return open(filename, 'rb')
+
+
+def read_into(f, buffer):
+    """Fill a writable buffer from a stream; returns False if the stream ends first"""
+    filled = 0
+    while filled < len(buffer):
+        n = f.readinto(buffer[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def source_signature(*filenames):
+    """Size and modification time of the source files, used as cache key"""
+    signature = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        signature.append({
+            "name": os.path.basename(filename),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns
+        })
+    return signature
+
+
+def load_cached_split(images_path, labels_path, cache_dir):
+    """
+    Return a dict with the split's uint8 images (memory-mapped), labels,
+    and per-class indices (class_order, class_offsets).
+    The cache is (re)built when missing or when the source files changed.
+    """
+    meta = {
+        "version": CACHE_VERSION,
+        "sources": source_signature(images_path, labels_path)
+    }
+    meta_path = os.path.join(cache_dir, "meta.json")
+
+    try:
+        with open(meta_path) as f:
+            is_valid = json.load(f) == meta
+    except (OSError, ValueError):
+        is_valid = False
+
+    if not is_valid:
+        build_cache(images_path, labels_path, cache_dir, meta)
+
+    return {
+        "images": np.load(os.path.join(cache_dir, "images.npy"), mmap_mode='r'),
+        "labels": np.load(os.path.join(cache_dir, "labels.npy")),
+        "class_order": np.load(os.path.join(cache_dir, "class_order.npy")),
+        "class_offsets": np.load(os.path.join(cache_dir, "class_offsets.npy"))
+    }
+
+
+def build_cache(images_path, labels_path, cache_dir, meta):
+    """Convert one IDX split into the cache directory"""
+    print(f"Building dataset cache in {cache_dir}")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # The metadata file marks a complete cache, so it is removed first and written last
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    # Images: streamed from the (possibly gzipped) IDX file into the .npy file
+    images_tmp = os.path.join(cache_dir, "images.tmp.npy")
+    with open_idx(images_path) as f:
+        magic, size = struct.unpack(">II", f.read(8))
+        nrows, ncols = struct.unpack(">II", f.read(8))
+        images = np.lib.format.open_memmap(images_tmp, mode='w+', dtype=np.uint8,
+                                           shape=(size, nrows, ncols))
+        for start in range(0, size, CHUNK_IMAGES):
+            chunk = images[start:start + CHUNK_IMAGES]
+            if not read_into(f, memoryview(chunk.reshape(-1))):
+                raise ValueError(f"Truncated IDX file: {images_path}")
+        images.flush()
+        del images
+
+    with open_idx(labels_path) as f:
+        magic, size = struct.unpack(">II", f.read(8))
+        labels = np.frombuffer(f.read(), dtype=np.uint8)
+
+    # Per-class indices; a stable sort keeps the original order inside each digit
+    class_order = np.argsort(labels, kind='stable')
+    class_offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=10))))
+
+    os.replace(images_tmp, os.path.join(cache_dir, "images.npy"))
+    for name, array in (("labels", labels), ("class_order", class_order),
+                        ("class_offsets", class_offsets)):
+        tmp_path = os.path.join(cache_dir, f"{name}.tmp.npy")
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(cache_dir, f"{name}.npy"))
+
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
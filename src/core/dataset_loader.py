@@ -1,21 +1,67 @@
 import numpy as np
 from PyQt5.QtGui import QImage, QPixmap
+import os
 import struct
+import threading
+from src.core.dataset_cache import load_cached_split, open_idx
+
+# Sub-directories tried for each split, and the IDX files they contain
+SPLIT_FILES = {
+    "test": (("testing",), "t10k-images.idx3-ubyte", "t10k-labels.idx1-ubyte"),
+    "train": (("training", "train"), "train-images.idx3-ubyte", "train-labels.idx1-ubyte"),
+}
+
+# One shared loader per data root
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+
+def get_dataset_loader(data_path):
+    """Return the process-wide DatasetLoader for a data root, creating it on first use"""
+    key = os.path.realpath(data_path)
+    with _loaders_lock:
+        if key not in _loaders:
+            _loaders[key] = DatasetLoader(key)
+        return _loaders[key]
+
 
 class DatasetLoader:
-    def __init__(self, data_path):
+    """
+    MNIST-style dataset read from IDX files (optionally gzipped).
+    Each split is read and normalized the first time one of its arrays is accessed.
+    Splits are converted once to a binary cache that later runs memory-map.
+    """
+    def __init__(self, data_path, cache_dir=None):
         self.data_path = data_path
-        self.train_images = None
-        self.train_labels = None
-        self.test_images = None
-        self.test_labels = None
+        self.cache_dir = cache_dir or os.path.join(data_path, ".cache")
+        self._raw = {}  # Split name -> uint8 images, labels and class indices
+        self._splits = {}  # Split name -> (normalized images, labels)
+        self._lock = threading.RLock()
         self.example_images = {}  # One example per digit
-        self.load_data()
-        self.prepare_examples()
+        self.class_order = None  # Sample indices sorted by label
+        self.class_offsets = None  # Start of each digit in class_order
+        self.thumbnails = {}  # (size, count) -> uint8 array (10, count, size, size)
+        self.pixmaps = {}  # (digit, example, size) -> QPixmap
+    
+    @property
+    def train_images(self):
+        return self.get_split("train")[0]
+    
+    @property
+    def train_labels(self):
+        return self.get_split("train")[1]
+    
+    @property
+    def test_images(self):
+        return self.get_split("test")[0]
+    
+    @property
+    def test_labels(self):
+        return self.get_split("test")[1]
     
     def read_idx_images(self, filename):
         """Read images in IDX format"""
-        with open(filename, 'rb') as f:
+        with open_idx(filename) as f:
             magic, size = struct.unpack(">II", f.read(8))
             nrows, ncols = struct.unpack(">II", f.read(8))
             data = np.frombuffer(f.read(), dtype=np.uint8)
@@ -25,65 +71,171 @@ class DatasetLoader:
     
     def read_idx_labels(self, filename):
         """Read labels in IDX format"""
-        with open(filename, 'rb') as f:
+        with open_idx(filename) as f:
             magic, size = struct.unpack(">II", f.read(8))
             data = np.frombuffer(f.read(), dtype=np.uint8)
             return data
     
-    def load_data(self):
-        """Load data from IDX files"""
+    def find_split_files(self, split):
+        """Return the (images, labels) paths of a split, or None if not found"""
+        folders, images_name, labels_name = SPLIT_FILES[split]
+        for folder in folders:
+            images_path = self.find_idx_file(os.path.join(self.data_path, folder), images_name)
+            labels_path = self.find_idx_file(os.path.join(self.data_path, folder), labels_name)
+            if images_path and labels_path:
+                return images_path, labels_path
+        return None
+    
+    def find_idx_file(self, folder, name):
+        """Find an IDX file, plain or gzipped (e.g. train-images-idx3-ubyte.gz)"""
+        for candidate in (name, name + ".gz", name.replace(".idx", "-idx") + ".gz"):
+            path = os.path.join(folder, candidate)
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def get_raw_split(self, split):
+        """
+        Return a dict with the uint8 images (possibly memory-mapped), labels,
+        class_order and class_offsets of a split, loading it on first access.
+        """
+        with self._lock:
+            if split not in self._raw:
+                self._raw[split] = self.load_split(split)
+            return self._raw[split]
+    
+    def get_split(self, split):
+        """Return (normalized images, labels) of a split, loading it on first access"""
+        with self._lock:
+            if split not in self._splits:
+                raw = self.get_raw_split(split)
+                if split == "train" and raw is self._raw.get("test"):
+                    # No training files: share the test arrays
+                    self._splits[split] = self.get_split("test")
+                else:
+                    # Normalize images
+                    self._splits[split] = (raw["images"].astype('float32') / 255.0, raw["labels"])
+            return self._splits[split]
+    
+    def load_split(self, split):
+        """Load one split from the binary cache, building it from the IDX files if needed"""
+        paths = self.find_split_files(split)
+        if paths is None and split == "train":
+            print("Training data not found, using test data for training")
+            return self.get_raw_split("test")
+        if paths is None:
+            # Report the default location in the error below
+            folders, images_name, labels_name = SPLIT_FILES[split]
+            paths = (os.path.join(self.data_path, folders[0], images_name),
+                     os.path.join(self.data_path, folders[0], labels_name))
+        
         try:
-            # Loading test data
-            test_images_path = f"{self.data_path}/testing/t10k-images.idx3-ubyte"
-            test_labels_path = f"{self.data_path}/testing/t10k-labels.idx1-ubyte"
-            
-            self.test_images = self.read_idx_images(test_images_path)
-            self.test_labels = self.read_idx_labels(test_labels_path)
-            
-            # Try to load training data
             try:
-                train_images_path = f"{self.data_path}/training/train-images.idx3-ubyte"
-                train_labels_path = f"{self.data_path}/training/train-labels.idx1-ubyte"
-                self.train_images = self.read_idx_images(train_images_path)
-                self.train_labels = self.read_idx_labels(train_labels_path)
+                raw = load_cached_split(paths[0], paths[1], os.path.join(self.cache_dir, split))
+            except OSError as e:
+                if not os.path.exists(paths[0]) or not os.path.exists(paths[1]):
+                    raise
+                # Read-only data folder: parse the IDX files directly
+                print(f"Dataset cache unavailable ({e}), reading IDX files")
+                labels = self.read_idx_labels(paths[1])
+                raw = {
+                    "images": self.read_idx_images(paths[0]),
+                    "labels": labels,
+                    "class_order": np.argsort(labels, kind='stable'),
+                    "class_offsets": np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=10))))
+                }
+            if split == "train":
                 print("Training data loaded successfully")
-            except Exception as e:
-                print("Training data not found, using test data for training")
-                self.train_images = self.test_images
-                self.train_labels = self.test_labels
-            
-            # Normalize images
-            self.train_images = self.train_images.astype('float32') / 255.0
-            self.test_images = self.test_images.astype('float32') / 255.0
-            
+            return raw
         except Exception as e:
             print(f"Error loading data: {e}")
             raise e
     
+    def load_data(self):
+        """Load both splits now instead of on first access"""
+        self.get_split("test")
+        self.get_split("train")
+    
     def prepare_examples(self):
-        """Prepare one example of each digit"""
-        if self.train_images is not None and self.train_labels is not None:
+        """Index the samples of each digit and keep the first example of each"""
+        with self._lock:
+            if self.class_order is not None:
+                return
+            # Per-class indices are computed once, with the split cache
+            raw = self.get_raw_split("train")
+            self.class_offsets = raw["class_offsets"]
+            self.class_order = raw["class_order"]
             for digit in range(10):
-                # Find the first example of each digit
-                idx = np.where(self.train_labels == digit)[0][0]
-                self.example_images[digit] = self.train_images[idx]
-    
-    def get_digit_image(self, digit):
-        """Convert a numpy image to QPixmap"""
-        if digit in self.example_images:
-            img_data = self.example_images[digit]
-            
-            # Data is already in uint8 (0-255)
-            
-            # Resize (28x28 -> 100x100)
-            from PIL import Image
-            img = Image.fromarray(img_data)
-            img = img.resize((100, 100))
-            img_data = np.array(img)
+                indices = self.get_class_indices(digit)
+                if len(indices) > 0:
+                    self.example_images[digit] = self.train_images[indices[0]]
+    
+    def get_class_indices(self, digit):
+        """Return the indices of all training samples of a digit"""
+        self.prepare_examples()
+        return self.class_order[self.class_offsets[digit]:self.class_offsets[digit + 1]]
+    
+    def get_digit_thumbnails(self, size=100, count=1):
+        """
+        Return uint8 thumbnails of shape (10, count, size, size):
+        the first `count` examples of each digit resized to size x size.
+        Missing examples are left black. Results are cached per (size, count).
+        """
+        key = (size, count)
+        self.prepare_examples()
+        if key not in self.thumbnails:
+            indices = np.zeros((10, count), dtype=np.int64)
+            available = np.zeros((10, count), dtype=bool)
+            for digit in range(10):
+                digit_indices = self.get_class_indices(digit)[:count]
+                indices[digit, :len(digit_indices)] = digit_indices
+                available[digit, :len(digit_indices)] = True
             
+            # Resize all examples in one pass
+            images = self.train_images[indices.ravel()]
+            resized = resize_images(images, size) * 255.0
+            thumbnails = np.rint(resized).clip(0, 255).astype(np.uint8)
+            thumbnails = thumbnails.reshape(10, count, size, size)
+            thumbnails[~available] = 0
+            self.thumbnails[key] = thumbnails
+        return self.thumbnails[key]
+    
+    def get_digit_image(self, digit, size=100, example=0):
+        """Return a cached QPixmap of one example of a digit"""
+        self.prepare_examples()
+        if digit not in self.example_images:
+            return None
+        
+        key = (digit, example, size)
+        if key not in self.pixmaps:
+            img_data = self.get_digit_thumbnails(size, example + 1)[digit, example]
             height, width = img_data.shape
-            bytes_per_line = width
-            
-            qimg = QImage(img_data.data, width, height, bytes_per_line, QImage.Format_Grayscale8)
-            return QPixmap.fromImage(qimg)
-        return None 
\ No newline at end of file
+            qimg = QImage(img_data.data, width, height, width, QImage.Format_Grayscale8)
+            self.pixmaps[key] = QPixmap.fromImage(qimg)  # Copies the pixels
+        return self.pixmaps[key]
+
+
+def resize_images(images, size):
+    """
+    Bilinear resize of a stack of square images (n, h, h) -> (n, size, size).
+    Interpolation is expressed as two small matrices applied to every image at once.
+    """
+    matrix = interpolation_matrix(images.shape[1], size)
+    resized = np.einsum('ij,njk,lk->nil', matrix, images.astype(np.float32), matrix, optimize=True)
+    return np.ascontiguousarray(resized)
+
+
+def interpolation_matrix(src_size, dst_size):
+    """Matrix (dst_size, src_size) that maps a 1D signal to its bilinear resize"""
+    # Sample at pixel centers, like PIL's bilinear resize
+    positions = (np.arange(dst_size) + 0.5) * src_size / dst_size - 0.5
+    positions = np.clip(positions, 0, src_size - 1)
+    low = np.floor(positions).astype(int)
+    high = np.minimum(low + 1, src_size - 1)
+    frac = (positions - low).astype(np.float32)
+    
+    matrix = np.zeros((dst_size, src_size), dtype=np.float32)
+    rows = np.arange(dst_size)
+    np.add.at(matrix, (rows, low), 1 - frac)
+    np.add.at(matrix, (rows, high), frac)
+    return matrix
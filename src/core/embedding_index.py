@@ -0,0 +1,74 @@
+"""
+Nearest training examples in the hidden-layer space.
+The hidden activations of every training image are computed in one batched
+pass and kept as a contiguous float32 matrix with their squared norms, so a
+query is a blocked matrix-vector product followed by argpartition.
+"""
+
+import numpy as np
+from src.utils.config import DATASET_CONFIG
+
+
+class EmbeddingIndex:
+    """
+    Top-k nearest-neighbour lookup over the hidden embeddings of `images`.
+    The embeddings belong to one ModelSnapshot (`snapshot`). When the weights
+    change, build() computes new ones outside the GUI thread and install()
+    swaps them in; until then queries use the previous embeddings.
+    """
+    def __init__(self, images, block_size=None):
+        self.images = images
+        self.block_size = block_size or DATASET_CONFIG["embedding_block_size"]
+        self.snapshot = None
+        self.embeddings = None  # (n, hidden_size) float32, C-contiguous
+        self.norms = None  # Squared norm of every embedding
+
+    def build(self, snapshot):
+        """
+        Embed all images with the snapshot's weights. Only reads the index,
+        so it can run in a background thread; returns the argument of install().
+        """
+        embeddings = np.empty((len(self.images), snapshot.hidden_size), dtype=np.float32)
+        for start in range(0, len(self.images), self.block_size):
+            block = self.images[start:start + self.block_size]
+            embeddings[start:start + len(block)] = snapshot.hidden_batch(block)
+        return snapshot, embeddings, np.einsum('ij,ij->i', embeddings, embeddings)
+
+    def install(self, built):
+        """Switch to embeddings returned by build() (in the thread that queries)"""
+        self.snapshot, self.embeddings, self.norms = built
+
+    def rebuild(self, snapshot):
+        """Embed all images with the snapshot's weights, in this thread"""
+        self.install(self.build(snapshot))
+
+    def embed(self, image):
+        """Hidden activations of one image with the weights of the index"""
+        return self.snapshot.hidden_batch(np.asarray(image)[None])[0]
+
+    def query(self, embedding, k=None):
+        """
+        Indices of the k images closest to `embedding` (hidden activations
+        computed with self.snapshot, see embed()), nearest first, and their
+        distances.
+        """
+        k = min(k or DATASET_CONFIG["neighbors"], len(self.images))
+        embeddings, norms = self.embeddings, self.norms
+
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        query_norm = np.dot(query, query)
+
+        # Best k of every block, then best k overall
+        candidates = []
+        distances = []
+        for start in range(0, len(embeddings), self.block_size):
+            block = embeddings[start:start + self.block_size]
+            squared = norms[start:start + self.block_size] - 2.0 * np.dot(block, query) + query_norm
+            best = np.argpartition(squared, k - 1)[:k] if k < len(squared) else np.arange(len(squared))
+            candidates.append(best + start)
+            distances.append(squared[best])
+        candidates = np.concatenate(candidates)
+        distances = np.concatenate(distances)
+
+        order = np.argsort(distances)[:k]
+        return candidates[order], np.sqrt(np.maximum(distances[order], 0.0))
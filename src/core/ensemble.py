@@ -0,0 +1,289 @@
+"""
+Ensembles of dense networks trained and evaluated as one.
+Single randomly initialized networks differ noticeably from run to run;
+averaging the probabilities of M of them is more accurate and more stable.
+
+The M members are stored stacked rather than as M SimpleNeuralNetwork
+objects: their first layers side by side in one (feature_size, M * hidden_size)
+matrix, so the hidden layers of all members come from a single product (which
+also keeps the sparse and incremental first-layer paths working), and their
+second layers as an (M, hidden_size, output_size) tensor applied with one
+batched matmul.
+"""
+
+import os
+import numpy as np
+from src.core.model_snapshot import InferenceResult, ModelSnapshot
+from src.core.neural_network import SimpleNeuralNetwork
+from src.core.sparse_input import use_sparse_input
+from src.utils.config import NETWORK_CONFIG
+
+
+class EnsembleSnapshot:
+    """
+    Read-only stacked weights of an EnsembleNetwork.
+    weights1 (feature_size, M * hidden_size), bias1 (1, M * hidden_size),
+    weights2 (M, hidden_size, output_size), bias2 (M, 1, output_size).
+    `members` holds one ModelSnapshot per member.
+
+    The weights are kept as float32: the first layer is M times larger than
+    a single network's and its product is bound by reading it from memory.
+    """
+    def __init__(self, weights1, bias1, weights2, bias2, version=0):
+        self.weights1 = ModelSnapshot.freeze(np.asarray(weights1, dtype=np.float32))
+        self.bias1 = ModelSnapshot.freeze(np.asarray(bias1, dtype=np.float32))
+        self.weights2 = ModelSnapshot.freeze(np.asarray(weights2, dtype=np.float32))
+        self.bias2 = ModelSnapshot.freeze(np.asarray(bias2, dtype=np.float32))
+        self.conv_layers = ()
+        self.version = version
+
+        self.ensemble_size, self.hidden_size, self.output_size = self.weights2.shape
+        self.input_size = self.feature_size = self.weights1.shape[0]
+
+        # Members, e.g. for the visualizer (which shows the first one)
+        h = self.hidden_size
+        self.members = tuple(
+            ModelSnapshot(self.weights1[:, i * h:(i + 1) * h], self.bias1[:, i * h:(i + 1) * h],
+                          self.weights2[i], self.bias2[i], version)
+            for i in range(self.ensemble_size)
+        )
+
+    def get_parameters(self):
+        """Return a writable copy of the stacked weights and biases"""
+        return {
+            "weights1": self.weights1.copy(),
+            "bias1": self.bias1.copy(),
+            "weights2": self.weights2.copy(),
+            "bias2": self.bias2.copy()
+        }
+
+    def sigmoid(self, x):
+        return 1 / (1 + np.exp(-x))
+
+    def hidden_input(self, x, feature_maps=None):
+        """Hidden pre-activations of all members for one flattened image, (1, M * hidden_size)"""
+        x = np.asarray(x, dtype=np.float32)
+        nonzero = use_sparse_input(x, self.weights1.shape[1])
+        if nonzero is not None:
+            return np.dot(x[nonzero], self.weights1[nonzero]) + self.bias1
+        return np.dot(x, self.weights1) + self.bias1
+
+    def outputs(self, hidden):
+        """Output activations of every member, (M, n, output_size), from hidden (n, M * hidden_size)"""
+        hidden = hidden.reshape(len(hidden), self.ensemble_size, self.hidden_size).transpose(1, 0, 2)
+        return hidden, self.sigmoid(np.matmul(hidden, self.weights2) + self.bias2)
+
+    def infer(self, x, hidden_input=None):
+        """
+        Forward pass of all members for one image. The probabilities are the
+        members' average; the activations are those of the first member, and
+        those of all members are in ensemble_activations (see saliency).
+        """
+        x = np.asarray(x).flatten()
+
+        # Check if input is empty (all pixels are black)
+        if np.all(x < 0.1):
+            return InferenceResult(np.zeros(self.output_size), None, None, self.members[0], ensemble=self)
+
+        if hidden_input is None:
+            hidden_input = self.hidden_input(x)
+        stacked = self.sigmoid(hidden_input)
+        hidden, outputs = self.outputs(stacked)
+        return InferenceResult(outputs.mean(axis=0).flatten(), hidden[0], outputs[0], self.members[0],
+                               member_probabilities=outputs[:, 0], ensemble=self,
+                               ensemble_activations=(stacked, outputs))
+
+    def hidden_batch(self, x):
+        """Hidden activations of all members for a batch of images, (n, M * hidden_size)"""
+        x = np.asarray(x, dtype=np.float32).reshape(len(x), -1)
+        return self.sigmoid(np.dot(x, self.weights1) + self.bias1)
+
+    def forward_batch(self, x):
+        """
+        Averaged probabilities for a batch of images (n, 28, 28) or (n, 784),
+        shape (n, output_size).
+        """
+        x = np.asarray(x, dtype=np.float32).reshape(len(x), -1)
+        output = self.outputs(self.hidden_batch(x))[1].mean(axis=0)
+
+        # Empty drawings get zero probabilities, as in infer()
+        output[np.all(x < 0.1, axis=1)] = 0.0
+        return output
+
+    def saliency(self, x, digit=None, result=None, activations=None):
+        """
+        Gradient of the averaged output for `digit` (default: the digit the
+        ensemble predicts) with respect to the input pixels; same arguments
+        and shapes as ModelSnapshot.saliency. `activations` are the stacked
+        (hidden (n, M * hidden_size), outputs (M, n, output_size) or None)
+        of all members, as in InferenceResult.ensemble_activations.
+
+        The vector-Jacobian products of all members are summed by one einsum
+        over the stacked second layer and one product with weights1.
+        """
+        x = np.asarray(x, dtype=np.float32)
+        single = x.ndim == 1 or x.shape == (28, 28)
+        x = x.reshape(1 if single else len(x), -1)
+        n, m = len(x), self.ensemble_size
+        if result is not None:
+            if not single:
+                raise ValueError("saliency(): result only supports a single image, use activations for a batch")
+            activations = result.ensemble_activations
+
+        hidden, outputs = activations if activations is not None else (self.hidden_batch(x), None)
+        hidden = np.asarray(hidden).reshape(n, m * self.hidden_size)
+        members_hidden, computed = self.outputs(hidden)  # (M, n, hidden_size), (M, n, output_size)
+        outputs = computed if outputs is None else np.asarray(outputs).reshape(m, n, self.output_size)
+
+        if digit is None:
+            digit = np.argmax(outputs.mean(axis=0), axis=1)
+        digit = np.broadcast_to(digit, (n,))
+        target = outputs[:, np.arange(n), digit]  # (M, n)
+
+        # d mean(o[digit]) / d hidden of every member, then back through weights1
+        output_delta = target * (1 - target) / m
+        hidden_delta = np.einsum('mn,mhn,mnh->nmh', output_delta, self.weights2[:, :, digit],
+                                 members_hidden * (1 - members_hidden))
+        maps = np.dot(hidden_delta.reshape(n, -1), self.weights1.T)
+
+        # Empty drawings have no prediction, as in infer()
+        maps = maps.reshape(n, 28, 28)
+        maps[np.all(x < 0.1, axis=1)] = 0.0
+        return maps[0] if single else maps
+
+
+class EnsembleNetwork:
+    """
+    M dense networks (784 -> hidden_size -> 10) trained side by side on the
+    same samples; they differ by their random initialization. Same interface
+    as SimpleNeuralNetwork (train_batch, publish, infer, forward_batch, ...),
+    so TrainingController, InferenceSession and OnlineLearner work unchanged.
+    """
+    def __init__(self, ensemble_size=None, hidden_size=None, learning_rate=None):
+        self.ensemble_size = ensemble_size or NETWORK_CONFIG["ensemble_size"]
+        self.input_size = 784  # 28x28 pixels
+        self.feature_size = self.input_size
+        self.hidden_size = hidden_size or NETWORK_CONFIG["hidden_size"]
+        self.output_size = 10
+        self.conv_layers = []
+
+        # He initialization of every member
+        m, h = self.ensemble_size, self.hidden_size
+        self.weights1 = np.random.randn(self.input_size, m * h) * np.sqrt(2.0/self.input_size)
+        self.weights2 = np.random.randn(m, h, self.output_size) * np.sqrt(2.0/h)
+        self.bias1 = np.zeros((1, m * h))
+        self.bias2 = np.zeros((m, 1, self.output_size))
+
+        self.learning_rate = learning_rate or NETWORK_CONFIG["learning_rate"]
+        self.weights_version = 0
+
+        self.snapshot = None
+        self.publish()
+
+    def sigmoid(self, x):
+        return 1 / (1 + np.exp(-x))
+
+    def publish(self, snapshot=None):
+        """Same as SimpleNeuralNetwork.publish, with an EnsembleSnapshot"""
+        if snapshot is None:
+            snapshot = EnsembleSnapshot(self.weights1, self.bias1, self.weights2, self.bias2,
+                                        self.weights_version)
+        else:
+            self.assign_parameters(snapshot.get_parameters())
+            self.weights_version = snapshot.version
+        self.snapshot = snapshot  # Atomic reference swap
+        return snapshot
+
+    def infer(self, x):
+        """Forward pass for one image with the published weights, returns an InferenceResult"""
+        return self.snapshot.infer(x)
+
+    def forward(self, x):
+        """Averaged output probabilities for one image"""
+        return self.infer(x).probabilities
+
+    def forward_batch(self, x):
+        """Averaged output probabilities for a batch of images, (n, output_size)"""
+        return self.snapshot.forward_batch(x)
+
+    def saliency(self, x, digit=None, result=None, activations=None):
+        """Input gradient maps of the averaged output (see EnsembleSnapshot.saliency)"""
+        return self.snapshot.saliency(x, digit, result, activations)
+
+    def get_parameters(self):
+        """Return a copy of the working weights and biases"""
+        return {
+            "weights1": self.weights1.copy(),
+            "bias1": self.bias1.copy(),
+            "weights2": self.weights2.copy(),
+            "bias2": self.bias2.copy()
+        }
+
+    def assign_parameters(self, parameters):
+        """Copy stacked parameters into the working weights"""
+        self.weights1 = np.array(parameters["weights1"], dtype=np.float64)
+        self.bias1 = np.array(parameters["bias1"], dtype=np.float64)
+        self.weights2 = np.array(parameters["weights2"], dtype=np.float64)
+        self.bias2 = np.array(parameters["bias2"], dtype=np.float64)
+        self.ensemble_size, self.hidden_size, self.output_size = self.weights2.shape
+        self.input_size = self.feature_size = self.weights1.shape[0]
+
+    def set_parameters(self, parameters):
+        """Replace the stacked weights and biases and publish them"""
+        self.assign_parameters(parameters)
+        self.weights_version += 1
+        self.publish()
+
+    def save(self, path):
+        """Save the published weights to a .npz file (see load_network)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez(path, **self.snapshot.get_parameters())
+
+    def quantize(self):
+        raise ValueError("Int8 quantization only supports single networks")
+
+    def train(self, x, y):
+        """
+        One SGD step of every member on a sample, as SimpleNeuralNetwork.train()
+        does for one network; returns the members' mean error.
+        """
+        x = np.asarray(x).reshape(1, -1)
+        m = self.ensemble_size
+
+        y_true = np.zeros((1, 1, self.output_size))
+        y_true[0, 0, y] = 1
+
+        # Forward pass: one product for all hidden layers, one batched matmul for the outputs
+        hidden_output = self.sigmoid(np.dot(x, self.weights1) + self.bias1)
+        hidden = hidden_output.reshape(m, 1, self.hidden_size)
+        output_activations = self.sigmoid(np.matmul(hidden, self.weights2) + self.bias2)
+
+        # Backward pass, per member
+        output_error = y_true - output_activations
+        output_delta = output_error * output_activations * (1 - output_activations)
+        hidden_delta = np.matmul(output_delta, self.weights2.transpose(0, 2, 1)) * hidden * (1 - hidden)
+        hidden_delta = hidden_delta.reshape(1, -1)
+
+        # Update weights
+        self.weights2 += self.learning_rate * np.matmul(hidden.transpose(0, 2, 1), output_delta)
+        self.bias2 += self.learning_rate * output_delta
+        self.weights1 += self.learning_rate * np.dot(x.T, hidden_delta)
+        self.bias1 += self.learning_rate * hidden_delta
+        self.weights_version += 1
+
+        return np.mean(np.abs(output_error))
+
+    def train_batch(self, x, y):
+        """Train on a mini-batch (per-sample updates), returns the mean error per sample"""
+        return float(np.mean([self.train(img, label) for img, label in zip(x, y)]))
+
+
+def load_network(path):
+    """Network saved by SimpleNeuralNetwork.save() or EnsembleNetwork.save()"""
+    with np.load(path) as data:
+        parameters = {name: data[name] for name in data.files}
+    network = EnsembleNetwork() if parameters["weights2"].ndim == 3 else SimpleNeuralNetwork()
+    network.set_parameters(parameters)
+    return network
@@ -0,0 +1,59 @@
+"""
+Incremental inference for a drawing in progress.
+Between two canvas updates only a few pixels change, so the hidden layer
+pre-activations are updated with the pixel delta instead of recomputed.
+"""
+
+import numpy as np
+from src.utils.config import NETWORK_CONFIG
+
+
+class InferenceSession:
+    """
+    Stateful inference for a sequence of similar inputs. Caches the last
+    input and its hidden pre-activations and applies only
+    delta[nz] @ weights1[nz] on each new input, with a full recomputation
+    every `refresh_interval` updates to bound rounding drift, and whenever
+    the network publishes a new snapshot.
+    """
+    def __init__(self, network, refresh_interval=None):
+        self.network = network
+        self.refresh_interval = refresh_interval or NETWORK_CONFIG["incremental_refresh_interval"]
+        self.reset()
+    
+    def reset(self):
+        """Forget the cached input; the next inference is a full pass"""
+        self.last_input = None
+        self.hidden_input = None
+        self.snapshot = None
+        self.updates_since_refresh = 0
+    
+    def infer(self, x):
+        """Same result as network.infer(x), computed from the change since the last call"""
+        snapshot = self.network.snapshot
+        x = np.asarray(x, dtype=np.float64).flatten()
+        
+        # Check if input is empty (all pixels are black); convolution
+        # features are not linear in the pixels, so they get a full pass too
+        if np.all(x < 0.1) or snapshot.conv_layers:
+            return snapshot.infer(x)
+        
+        if self.last_input is None or snapshot is not self.snapshot \
+                or self.updates_since_refresh >= self.refresh_interval:
+            self.hidden_input = snapshot.hidden_input(x)
+            self.snapshot = snapshot
+            self.updates_since_refresh = 0
+        else:
+            changed = np.flatnonzero(x != self.last_input)
+            if changed.size > 0:
+                delta = x[changed] - self.last_input[changed]
+                self.hidden_input = self.hidden_input + np.dot(delta, snapshot.weights1[changed])
+            self.updates_since_refresh += 1
+        self.last_input = x
+        
+        # Remaining layers as in a full pass
+        return snapshot.infer(x, hidden_input=self.hidden_input)
+    
+    def forward(self, x):
+        """Output probabilities for x"""
+        return self.infer(x).probabilities
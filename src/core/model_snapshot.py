@@ -0,0 +1,191 @@
+"""
+Immutable model snapshots and inference results.
+Trainers update their own working weights and publish them as a new
+ModelSnapshot; inference and visualization only ever read snapshots, so a
+snapshot can be used from any thread while training continues.
+"""
+
+import numpy as np
+from src.core.sparse_input import use_sparse_input
+from src.core.conv_layer import INPUT_SHAPE, layers_to_parameters, run_layers
+
+
+class InferenceResult:
+    """Output of one forward pass: probabilities plus the activations that produced them"""
+    def __init__(self, probabilities, hidden_activations, output_activations, snapshot,
+                 feature_maps=None, member_probabilities=None, ensemble=None, ensemble_activations=None):
+        self.probabilities = probabilities  # (output_size,)
+        self.hidden_activations = hidden_activations  # (1, hidden_size), None for empty input
+        self.output_activations = output_activations  # (1, output_size), None for empty input
+        self.snapshot = snapshot  # Weights used for this result
+        self.feature_maps = feature_maps  # (height, width, filters) per conv layer, or None
+        self.member_probabilities = member_probabilities  # (members, output_size) for ensembles, or None
+        # For ensembles: the activations above are the first member's (`snapshot`);
+        # `ensemble` is the EnsembleSnapshot and `ensemble_activations` the
+        # (hidden, outputs) of all members that the probabilities average
+        self.ensemble = ensemble
+        self.ensemble_activations = ensemble_activations
+
+
+class ModelSnapshot:
+    """
+    Read-only copy of the weights and biases of a SimpleNeuralNetwork.
+    `version` increases with every published snapshot of a network.
+    With conv_layers (ConvPoolLayer), weights1 reads their flattened
+    output (feature_size values) instead of the pixels.
+    """
+    def __init__(self, weights1, bias1, weights2, bias2, version=0, conv_layers=()):
+        self.weights1 = self.freeze(weights1)
+        self.bias1 = self.freeze(bias1)
+        self.weights2 = self.freeze(weights2)
+        self.bias2 = self.freeze(bias2)
+        self.conv_layers = tuple(layer.frozen() for layer in conv_layers)
+        self.version = version
+        
+        self.feature_size, self.hidden_size = self.weights1.shape
+        self.input_size = int(np.prod(INPUT_SHAPE)) if self.conv_layers else self.feature_size
+        self.output_size = self.weights2.shape[1]
+    
+    @staticmethod
+    def freeze(array):
+        array = np.array(array, copy=True)
+        array.flags.writeable = False
+        return array
+    
+    def get_parameters(self):
+        """Return a writable copy of the weights and biases"""
+        parameters = {
+            "weights1": self.weights1.copy(),
+            "bias1": self.bias1.copy(),
+            "weights2": self.weights2.copy(),
+            "bias2": self.bias2.copy()
+        }
+        parameters.update(layers_to_parameters(self.conv_layers))
+        return parameters
+    
+    def sigmoid(self, x):
+        return 1 / (1 + np.exp(-x))
+    
+    def features(self, x):
+        """Input of the dense layers for a batch: the pixels, or the flattened conv output"""
+        x = np.asarray(x, dtype=np.float32).reshape(len(x), -1)
+        if not self.conv_layers:
+            return x
+        return run_layers(self.conv_layers, x)[-1].reshape(len(x), -1)
+    
+    def hidden_input(self, x, feature_maps=None):
+        """Hidden layer pre-activations for one flattened image"""
+        if self.conv_layers:
+            if feature_maps is None:
+                feature_maps = run_layers(self.conv_layers, x[None])
+            x = feature_maps[-1].ravel()
+        nonzero = use_sparse_input(x, self.hidden_size)
+        if nonzero is not None:
+            # Only the rows of weights1 for non-zero pixels contribute
+            return np.dot(x[nonzero], self.weights1[nonzero]) + self.bias1
+        return np.dot(x, self.weights1) + self.bias1
+    
+    def infer(self, x, hidden_input=None):
+        """
+        Forward pass for one image. `hidden_input` can supply precomputed
+        hidden pre-activations (see InferenceSession).
+        """
+        x = np.asarray(x).flatten()
+        
+        # Check if input is empty (all pixels are black)
+        if np.all(x < 0.1):
+            return InferenceResult(np.zeros(self.output_size), None, None, self)
+        
+        # Convolution layers, kept for visualization
+        feature_maps = None
+        if self.conv_layers:
+            feature_maps = [maps[0] for maps in run_layers(self.conv_layers, x[None])]
+        
+        # First layer
+        if hidden_input is None:
+            hidden_input = self.hidden_input(x, feature_maps)
+        hidden_activations = self.sigmoid(hidden_input)
+        
+        # Output layer
+        output_activations = self.sigmoid(np.dot(hidden_activations, self.weights2) + self.bias2)
+        return InferenceResult(output_activations.flatten(), hidden_activations, output_activations, self,
+                               feature_maps)
+    
+    def hidden_batch(self, x):
+        """Hidden layer activations for a batch of images, shape (n, hidden_size)"""
+        return self.sigmoid(np.dot(self.features(x), self.weights1) + self.bias1)
+    
+    def forward_batch(self, x):
+        """
+        Forward pass for a batch of images (n, 28, 28) or (n, 784).
+        Returns probabilities of shape (n, output_size).
+        """
+        x = np.asarray(x, dtype=np.float32).reshape(len(x), -1)
+        output = self.sigmoid(np.dot(self.hidden_batch(x), self.weights2) + self.bias2)
+        
+        # Empty drawings get zero probabilities, as in infer()
+        output[np.all(x < 0.1, axis=1)] = 0.0
+        return output
+    
+    def saliency(self, x, digit=None, result=None, activations=None):
+        """
+        Gradient of the output for `digit` (default: the predicted digit) with
+        respect to the input pixels. x is one image, or a batch (n, 784) /
+        (n, 28, 28) with digit None, an int or one digit per image.
+        Returns a 28x28 map, or (n, 28, 28) for a batch.
+        
+        For dense networks this is the closed-form vector-Jacobian product
+        W1 @ (h(1-h) * W2[:, digit] * o(1-o)). No forward pass is run when the
+        activations are given: `result`, the InferenceResult of a single
+        image, or `activations` = (hidden (n, hidden_size), output
+        (n, output_size) or None) for a batch, e.g. from hidden_batch().
+        Convolution networks need one forward pass to backpropagate through
+        their layers, so they ignore both.
+        """
+        x = np.asarray(x, dtype=np.float32)
+        single = x.ndim == 1 or x.shape == INPUT_SHAPE[:2]
+        x = x.reshape(1 if single else len(x), -1)
+        n = len(x)
+        if result is not None:
+            if not single:
+                raise ValueError("saliency(): result only supports a single image, use activations for a batch")
+            if result.hidden_activations is not None:
+                activations = (result.hidden_activations, result.output_activations)
+        
+        caches = []
+        if activations is not None and not self.conv_layers:
+            hidden, output = activations
+            hidden = np.asarray(hidden).reshape(n, self.hidden_size)
+            if output is None:
+                output = self.sigmoid(np.dot(hidden, self.weights2) + self.bias2)
+            output = np.asarray(output).reshape(n, self.output_size)
+        else:
+            features = x
+            if self.conv_layers:
+                features = features.reshape((n,) + INPUT_SHAPE)
+                for layer in self.conv_layers:
+                    features, cache = layer.forward(features, keep_cache=True)
+                    caches.append(cache)
+                pooled_shape = features.shape
+                features = features.reshape(n, -1)
+            hidden = self.sigmoid(np.dot(features, self.weights1) + self.bias1)
+            output = self.sigmoid(np.dot(hidden, self.weights2) + self.bias2)
+        
+        if digit is None:
+            digit = np.argmax(output, axis=1)
+        digit = np.broadcast_to(digit, (n,))
+        target = output[np.arange(n), digit]
+        
+        # Backward from the chosen output only
+        output_delta = target * (1 - target)
+        hidden_delta = output_delta[:, None] * self.weights2[:, digit].T * hidden * (1 - hidden)
+        maps = np.dot(hidden_delta, self.weights1.T)
+        if self.conv_layers:
+            maps = maps.astype(np.float32).reshape(pooled_shape)
+            for layer, cache in zip(reversed(self.conv_layers), reversed(caches)):
+                maps = layer.backward(maps, cache)[2]
+        
+        # Empty drawings have no prediction, as in infer()
+        maps = maps.reshape(n, INPUT_SHAPE[0], INPUT_SHAPE[1])
+        maps[np.all(x < 0.1, axis=1)] = 0.0
+        return maps[0] if single else maps
@@ -1,29 +1,50 @@
+import os
 import numpy as np
+from src.core.model_snapshot import ModelSnapshot
+from src.core.quantization import QuantizedNetwork
+from src.core.conv_layer import (INPUT_SHAPE, create_layers, layers_from_parameters,
+                                 layers_to_parameters)
+from src.utils.config import NETWORK_CONFIG
 
 class SimpleNeuralNetwork:
     """
     A simple neural network for digit recognition.
-    Architecture: 784 (28x28) input -> 28 hidden -> 10 output neurons
+    Architecture: 784 (28x28) input -> 28 hidden -> 10 output neurons,
+    optionally with convolution + pooling layers in front of the hidden layer
+    (conv_layers, see NETWORK_CONFIG).
+    
+    train() updates the working weights in place. Inference reads the last
+    published ModelSnapshot, so training must call publish() to make new
+    weights visible; publishing swaps a single reference.
     """
-    def __init__(self):
+    def __init__(self, hidden_size=None, learning_rate=None, conv_layers=None):
         # Network architecture
         self.input_size = 784  # 28x28 pixels
-        self.hidden_size = 28  # Hidden layer neurons
+        self.hidden_size = hidden_size or NETWORK_CONFIG["hidden_size"]  # Hidden layer neurons
         self.output_size = 10  # Output neurons (digits 0-9)
         
+        # Optional convolution layers; weights1 then reads their flattened output
+        if conv_layers is None:
+            conv_layers = NETWORK_CONFIG["conv_layers"]
+        self.conv_layers, feature_shape = create_layers(conv_layers)
+        self.feature_size = int(np.prod(feature_shape)) if self.conv_layers else self.input_size
+        
         # Initialize weights using He initialization
-        self.weights1 = np.random.randn(self.input_size, self.hidden_size) * np.sqrt(2.0/self.input_size)
+        self.weights1 = np.random.randn(self.feature_size, self.hidden_size) * np.sqrt(2.0/self.feature_size)
         self.weights2 = np.random.randn(self.hidden_size, self.output_size) * np.sqrt(2.0/self.hidden_size)
         
         # Initialize biases
         self.bias1 = np.zeros((1, self.hidden_size))
         self.bias2 = np.zeros((1, self.output_size))
         
-        # Store activations for visualization
-        self.hidden_activations = None
-        self.output_activations = None
+        self.learning_rate = learning_rate or NETWORK_CONFIG["learning_rate"]
         
-        self.learning_rate = 0.1
+        # Incremented on every weight update (lets caches detect stale weights)
+        self.weights_version = 0
+        
+        # Weights seen by inference
+        self.snapshot = None
+        self.publish()
     
     def sigmoid(self, x):
         return 1 / (1 + np.exp(-x))
@@ -31,27 +52,89 @@ class SimpleNeuralNetwork:
     def sigmoid_derivative(self, x):
         return x * (1 - x)
     
+    def publish(self, snapshot=None):
+        """
+        Make weights visible to inference and return the new snapshot.
+        Without argument the current working weights are published; with a
+        snapshot (e.g. from another trainer) the working weights are reset to it.
+        """
+        if snapshot is None:
+            snapshot = ModelSnapshot(self.weights1, self.bias1, self.weights2, self.bias2,
+                                     self.weights_version, self.conv_layers)
+        else:
+            self.weights1 = np.array(snapshot.weights1)
+            self.bias1 = np.array(snapshot.bias1)
+            self.weights2 = np.array(snapshot.weights2)
+            self.bias2 = np.array(snapshot.bias2)
+            self.conv_layers = [layer.copy() for layer in snapshot.conv_layers]
+            self.input_size, self.feature_size = snapshot.input_size, snapshot.feature_size
+            self.weights_version = snapshot.version
+        self.snapshot = snapshot  # Atomic reference swap
+        return snapshot
+    
+    def infer(self, x):
+        """Forward pass for one image with the published weights, returns an InferenceResult"""
+        return self.snapshot.infer(x)
+    
     def forward(self, x):
-        """Forward pass through the network"""
-        if len(x.shape) > 1:
-            x = x.flatten()
-        
-        # Check if input is empty (all pixels are black)
-        if np.all(x < 0.1):  # Increased threshold here too
-            return np.zeros(self.output_size)  # Return zero probabilities
-        
-        # First layer
-        hidden = np.dot(x, self.weights1) + self.bias1
-        self.hidden_activations = self.sigmoid(hidden)
-        
-        # Output layer
-        output = np.dot(self.hidden_activations, self.weights2) + self.bias2
-        self.output_activations = self.sigmoid(output)
-        
-        # Ensure the result is a 1D array of size output_size
-        return np.array(self.output_activations).flatten()
+        """Forward pass through the network, returns the output probabilities"""
+        return self.infer(x).probabilities
+    
+    def forward_batch(self, x):
+        """Forward pass for a batch of images, returns (n, output_size) probabilities"""
+        return self.snapshot.forward_batch(x)
+    
+    def saliency(self, x, digit=None, result=None, activations=None):
+        """Input gradient maps of a digit's output (see ModelSnapshot.saliency)"""
+        return self.snapshot.saliency(x, digit, result, activations)
+    
+    def get_parameters(self):
+        """Return a copy of the working weights and biases"""
+        parameters = {
+            "weights1": self.weights1.copy(),
+            "bias1": self.bias1.copy(),
+            "weights2": self.weights2.copy(),
+            "bias2": self.bias2.copy()
+        }
+        parameters.update(layers_to_parameters(self.conv_layers))
+        return parameters
+    
+    def set_parameters(self, parameters):
+        """Replace the weights and biases (e.g. with a saved checkpoint) and publish them"""
+        self.weights1 = parameters["weights1"].copy()
+        self.bias1 = parameters["bias1"].copy()
+        self.weights2 = parameters["weights2"].copy()
+        self.bias2 = parameters["bias2"].copy()
+        self.conv_layers = layers_from_parameters(parameters)
+        self.feature_size, self.hidden_size = self.weights1.shape
+        self.input_size = int(np.prod(INPUT_SHAPE)) if self.conv_layers else self.feature_size
+        self.output_size = self.weights2.shape[1]
+        self.weights_version += 1
+        self.publish()
+    
+    def save(self, path):
+        """Save the published weights to a .npz file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez(path, **self.snapshot.get_parameters())
+    
+    @classmethod
+    def load(cls, path):
+        """Create a network from weights saved with save()"""
+        network = cls()
+        with np.load(path) as data:
+            network.set_parameters({name: data[name] for name in data.files})
+        return network
+    
+    def quantize(self):
+        """Return an int8 copy of the published weights for inference"""
+        return QuantizedNetwork(self.snapshot)
     
     def train(self, x, y):
+        if self.conv_layers:
+            return self.train_batch(np.asarray(x)[None], [y])
+        
         # Forward pass
         if len(x.shape) > 1:
             x = x.flatten()
@@ -81,5 +164,56 @@ class SimpleNeuralNetwork:
         
         self.weights1 += self.learning_rate * np.dot(x.reshape(-1, 1), hidden_delta)
         self.bias1 += self.learning_rate * hidden_delta
+        self.weights_version += 1
+        
+        return np.mean(np.abs(output_error))
+    
+    def train_batch(self, x, y):
+        """
+        Train on a mini-batch of images and labels, returns the mean error per sample.
+        Dense-only networks keep their per-sample updates (train()). With
+        convolution layers every layer is updated once per batch, from one
+        matrix product per layer; updates are summed over the batch so each
+        sample moves the weights as much as in train().
+        """
+        if not self.conv_layers:
+            return float(np.mean([self.train(img, label) for img, label in zip(x, y)]))
+        
+        n = len(x)
+        features = np.asarray(x, dtype=np.float32).reshape((n,) + INPUT_SHAPE)
+        caches = []
+        for layer in self.conv_layers:
+            features, cache = layer.forward(features, keep_cache=True)
+            caches.append(cache)
+        pooled_shape = features.shape
+        features = features.reshape(n, -1)
+        
+        y_true = np.zeros((n, self.output_size))
+        y_true[np.arange(n), y] = 1
+        
+        # Forward pass
+        hidden_output = self.sigmoid(np.dot(features, self.weights1) + self.bias1)
+        output_activations = self.sigmoid(np.dot(hidden_output, self.weights2) + self.bias2)
+        
+        # Backward pass (same error as train())
+        output_error = y_true - output_activations
+        output_delta = output_error * self.sigmoid_derivative(output_activations)
+        hidden_delta = np.dot(output_delta, self.weights2.T) * self.sigmoid_derivative(hidden_output)
+        features_delta = np.dot(hidden_delta, self.weights1.T).astype(np.float32)
+        
+        # Update dense weights
+        self.weights2 += self.learning_rate * np.dot(hidden_output.T, output_delta)
+        self.bias2 += self.learning_rate * output_delta.sum(axis=0, keepdims=True)
+        self.weights1 += self.learning_rate * np.dot(features.T, hidden_delta)
+        self.bias1 += self.learning_rate * hidden_delta.sum(axis=0, keepdims=True)
+        
+        # Update convolution layers, last to first
+        delta = features_delta.reshape(pooled_shape)
+        for i in reversed(range(len(self.conv_layers))):
+            layer = self.conv_layers[i]
+            kernels_delta, bias_delta, delta = layer.backward(delta, caches[i], input_delta=i > 0)
+            layer.kernels += self.learning_rate * kernels_delta
+            layer.bias += self.learning_rate * bias_delta
+        self.weights_version += 1
         
-        return np.mean(np.abs(output_error)) 
\ No newline at end of file
+        return float(np.mean(np.abs(output_error)))
@@ -0,0 +1,122 @@
+"""
+Online learning from user corrections.
+Corrected drawings go into a bounded replay buffer; a background worker
+fine-tunes a private copy of the network on mini-batches mixing corrections
+with rehearsal samples from the training set, then publishes the new weights.
+"""
+
+import queue
+import threading
+import numpy as np
+from src.utils.config import ONLINE_LEARNING_CONFIG
+
+
+class ReplayBuffer:
+    """Fixed-capacity buffer of (image, label) pairs; the oldest pairs are overwritten"""
+    def __init__(self, capacity, input_size=784):
+        self.capacity = capacity
+        self.images = np.zeros((capacity, input_size), dtype=np.float32)
+        self.labels = np.zeros(capacity, dtype=np.int64)
+        self.pos = 0
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def add(self, image, label):
+        self.images[self.pos] = np.asarray(image, dtype=np.float32).flatten()
+        self.labels[self.pos] = label
+        self.pos = (self.pos + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+    
+    def sample(self, n, rng):
+        """Return n random pairs (with replacement)"""
+        indices = rng.integers(0, self.count, size=n)
+        return self.images[indices], self.labels[indices]
+
+
+class OnlineLearner:
+    """
+    Background fine-tuning of a network from corrections.
+
+    The worker trains its own copy of the network. After each round of
+    updates it publishes the copy's weights as a new snapshot and hands it to
+    on_update(snapshot), which must install it on the live network with
+    network.publish(snapshot) in the thread that owns that network (e.g.
+    through a queued Qt signal). The worker never writes the live network's
+    working arrays; without on_update it publishes the snapshot itself, which
+    is only safe when no other thread reads them.
+    """
+    def __init__(self, network, dataset_loader=None, on_update=None):
+        config = ONLINE_LEARNING_CONFIG
+        self.batch_size = config["batch_size"]
+        self.corrections_per_batch = max(1, int(self.batch_size * config["correction_fraction"]))
+        self.updates_per_correction = config["updates_per_correction"]
+        self.dataset_loader = dataset_loader
+        self.on_update = on_update
+        self.target = network
+        self.buffer = ReplayBuffer(config["buffer_size"], network.input_size)
+        self.rng = np.random.default_rng()
+        
+        # Private copy of the network owned by the worker thread
+        self.network = type(network)()
+        self.network.publish(network.snapshot)
+        self.network.learning_rate = config["learning_rate"]
+        
+        self.corrections = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def add_correction(self, image, label):
+        """Queue a drawing with its correct digit (thread-safe)"""
+        self.corrections.put((np.array(image, dtype=np.float32), int(label)))
+    
+    def stop(self):
+        """Stop the worker thread"""
+        self.corrections.put(None)
+        self.thread.join(timeout=1.0)
+    
+    def run(self):
+        """Worker loop: wait for corrections, fine-tune, publish"""
+        while True:
+            item = self.corrections.get()
+            if item is None:
+                return
+            self.buffer.add(*item)
+            
+            # Take every correction already waiting before training
+            pending = 1
+            while not self.corrections.empty():
+                item = self.corrections.get()
+                if item is None:
+                    return
+                self.buffer.add(*item)
+                pending += 1
+            
+            for _ in range(self.updates_per_correction * pending):
+                images, labels = self.next_batch()
+                self.network.train_batch(images, labels)
+            
+            snapshot = self.network.publish()
+            if self.on_update is not None:
+                self.on_update(snapshot)
+            else:
+                self.target.publish(snapshot)
+    
+    def next_batch(self):
+        """Mini-batch of recent corrections mixed with rehearsal samples"""
+        images, labels = self.buffer.sample(self.corrections_per_batch, self.rng)
+        n_rehearsal = self.batch_size - len(images)
+        if self.dataset_loader is None or n_rehearsal <= 0:
+            return images, labels
+        
+        # Rehearsal samples from the training set limit forgetting
+        train_images = self.dataset_loader.train_images
+        indices = self.rng.integers(0, len(train_images), size=n_rehearsal)
+        rehearsal_images = train_images[indices].reshape(n_rehearsal, -1)
+        rehearsal_labels = self.dataset_loader.train_labels[indices]
+        
+        order = self.rng.permutation(self.batch_size)
+        images = np.concatenate([images, rehearsal_images])[order]
+        labels = np.concatenate([labels, rehearsal_labels])[order]
+        return images, labels
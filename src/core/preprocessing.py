@@ -0,0 +1,99 @@
+"""
+Image preprocessing shared by the drawing canvas and the headless tools.
+Turns a 28x28 raster (or raw stroke points) into the normalized network input.
+"""
+
+import numpy as np
+
+# Same settings as the canvas: pen width in 28x28 pixels, blur and noise threshold
+STROKE_WIDTH = 3
+BLUR_SIGMA = 0.5
+THRESHOLD = 0.15
+
+
+def gaussian_kernel(sigma, truncate=4.0):
+    """1D Gaussian kernel with the same radius as scipy.ndimage.gaussian_filter"""
+    radius = int(truncate * sigma + 0.5)
+    x = np.arange(-radius, radius + 1, dtype=np.float64)
+    kernel = np.exp(-0.5 * (x / sigma) ** 2)
+    return kernel / kernel.sum()
+
+
+def gaussian_blur(image, sigma=BLUR_SIGMA):
+    """
+    Separable Gaussian blur of a 2D image with mirrored borders
+    (equivalent to scipy.ndimage.gaussian_filter with its default 'reflect' mode).
+    """
+    kernel = gaussian_kernel(sigma)
+    radius = len(kernel) // 2
+    h, w = image.shape
+    padded = np.pad(image.astype(np.float64), radius, mode='symmetric')
+    
+    # Rows, then columns
+    rows = sum(k * padded[:, i:i + w] for i, k in enumerate(kernel))
+    blurred = sum(k * rows[i:i + h, :] for i, k in enumerate(kernel))
+    return blurred.astype(np.float32)
+
+
+def normalize_raster(raster):
+    """
+    Convert a 28x28 raster (uint8 0-255 or float 0-1) to the network input:
+    scaled to [0, 1], slightly blurred, thresholded. Almost empty images become zeros.
+    """
+    raster = np.asarray(raster)
+    if raster.dtype == np.uint8:
+        normalized = raster.astype(np.float32) / 255.0
+    else:
+        normalized = raster.astype(np.float32)
+    
+    # Slight blur for softening edges
+    normalized = gaussian_blur(normalized)
+    
+    # Apply higher threshold to eliminate noise
+    normalized[normalized < THRESHOLD] = 0.0
+    
+    # Additional check: if the image is almost empty, consider it empty
+    if np.sum(normalized) < 1.0:
+        return np.zeros(raster.shape, dtype=np.float32)
+    
+    return normalized
+
+
+def rasterize_strokes(strokes, width, height, size=28, stroke_width=STROKE_WIDTH):
+    """
+    Draw strokes given in canvas coordinates (lists of (x, y) points on a
+    width x height canvas) into a size x size uint8 raster. Matches the
+    canvas' aliased Qt pen up to a few edge pixels, which the blur smooths out.
+    """
+    raster = np.zeros((size, size), dtype=np.uint8)
+    
+    # Scale points to the raster (truncated, as the canvas does)
+    segments = []
+    for stroke in strokes:
+        points = np.asarray(stroke, dtype=np.float64).reshape(-1, 2)
+        if len(points) < 2:
+            continue
+        points = np.floor(points * [size / width, size / height])
+        segments.append(np.stack([points[:-1], points[1:]], axis=1))
+    if not segments:
+        return raster
+    segments = np.concatenate(segments)  # (n_segments, 2 endpoints, 2 coordinates)
+    
+    # Distance of every pixel center to every segment
+    ys, xs = np.mgrid[0:size, 0:size]
+    centers = np.stack([xs.ravel(), ys.ravel()], axis=1).astype(np.float64) + 0.5
+    start = segments[:, 0]
+    direction = segments[:, 1] - start
+    length_sq = np.maximum(np.sum(direction ** 2, axis=1), 1e-12)
+    t = np.clip(((centers[:, None, :] - start) * direction).sum(axis=2) / length_sq, 0.0, 1.0)
+    closest = start + t[..., None] * direction
+    distance = np.sqrt(((centers[:, None, :] - closest) ** 2).sum(axis=2)).min(axis=1)
+    
+    # Round caps and joins: every pixel within half the pen width is painted
+    raster.ravel()[distance <= stroke_width / 2] = 255
+    return raster
+
+
+def preprocess_strokes(strokes, width=280, height=280):
+    """Strokes in canvas coordinates -> normalized 28x28 network input"""
+    return normalize_raster(rasterize_strokes(strokes, width, height))
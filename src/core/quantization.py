@@ -0,0 +1,142 @@
+"""
+Post-training int8 quantization of SimpleNeuralNetwork.
+Weights are stored as int8 with one scale per output neuron (per channel)
+and activations are quantized to 256 levels over [0, 1].
+
+NumPy has no int8 matrix product, and its integer matmul does not use BLAS,
+so the integer levels are multiplied as float32. The products are small
+integers, so the result matches int32 accumulation for realistic inputs
+while running on the BLAS float32 kernel.
+"""
+
+import time
+import numpy as np
+from src.core.model_snapshot import InferenceResult
+from src.core.sparse_input import use_sparse_input
+
+
+def quantize_per_channel(weights):
+    """
+    Symmetric int8 quantization with one scale per column.
+    Returns (int8 weights, float32 scales) with weights ~= q * scales.
+    """
+    max_abs = np.abs(weights).max(axis=0)
+    scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    q = np.clip(np.rint(weights / scales), -127, 127).astype(np.int8)
+    return q, scales
+
+
+def quantize_activations(x):
+    """Quantize values in [0, 1] (images, sigmoid outputs) to the levels 0..255 (scale 1/255)"""
+    levels = np.multiply(x, np.float32(255.0), dtype=np.float32)
+    return np.rint(levels, out=levels)
+
+
+class QuantizedNetwork:
+    """
+    Int8 inference copy of a ModelSnapshot.
+    Exposes the same infer/forward/forward_batch interface as the float network,
+    and can itself be used as the snapshot of its inference results.
+    """
+    def __init__(self, snapshot):
+        if snapshot.conv_layers:
+            raise ValueError("Int8 quantization only supports dense networks (no conv_layers)")
+        self.input_size = snapshot.input_size
+        self.hidden_size = snapshot.hidden_size
+        self.output_size = snapshot.output_size
+        self.version = snapshot.version
+        
+        self.weights1_q, self.scales1 = quantize_per_channel(snapshot.weights1)
+        self.weights2_q, self.scales2 = quantize_per_channel(snapshot.weights2)
+        self.bias1 = snapshot.bias1.astype(np.float32)
+        self.bias2 = snapshot.bias2.astype(np.float32)
+        
+        # Combined input (1/255) and weight scales applied to the accumulators
+        self.output_scales1 = self.scales1 / np.float32(255.0)
+        self.output_scales2 = self.scales2 / np.float32(255.0)
+    
+    @property
+    def weights1(self):
+        """Dequantized first layer weights (for visualization)"""
+        return self.weights1_q * self.scales1
+    
+    @property
+    def weights2(self):
+        """Dequantized second layer weights (for visualization)"""
+        return self.weights2_q * self.scales2
+    
+    def nbytes(self):
+        """Memory used by the parameters"""
+        return sum(a.nbytes for a in (self.weights1_q, self.scales1, self.weights2_q,
+                                      self.scales2, self.bias1, self.bias2))
+    
+    def sigmoid(self, x):
+        return 1 / (1 + np.exp(-x))
+    
+    def layers(self, x, nonzero=None):
+        """
+        Quantized forward pass for a 2D batch, returns (hidden, output).
+        For a single image, `nonzero` restricts the first layer to those pixels.
+        """
+        # First layer: 8-bit inputs x int8 weights
+        if nonzero is not None:
+            acc = np.dot(quantize_activations(x[:, nonzero]),
+                         self.weights1_q[nonzero].astype(np.float32))
+        else:
+            acc = np.dot(quantize_activations(x), self.weights1_q.astype(np.float32))
+        hidden = self.sigmoid(acc * self.output_scales1 + self.bias1)
+        
+        # Output layer: hidden activations are in [0, 1] too
+        acc = np.dot(quantize_activations(hidden), self.weights2_q.astype(np.float32))
+        output = self.sigmoid(acc * self.output_scales2 + self.bias2)
+        return hidden, output
+    
+    def infer(self, x):
+        """Forward pass for one image, returns an InferenceResult"""
+        x = np.asarray(x).reshape(1, -1)
+        
+        # Check if input is empty (all pixels are black)
+        if np.all(x < 0.1):
+            return InferenceResult(np.zeros(self.output_size), None, None, self)
+        
+        nonzero = use_sparse_input(x[0], self.hidden_size)
+        hidden_activations, output_activations = self.layers(x, nonzero)
+        return InferenceResult(output_activations.flatten(), hidden_activations, output_activations, self)
+    
+    def forward(self, x):
+        """Forward pass for one image, returns the output probabilities"""
+        return self.infer(x).probabilities
+    
+    def forward_batch(self, x):
+        """Forward pass for a batch of images, returns (n, output_size)"""
+        x = np.asarray(x).reshape(len(x), -1)
+        output = self.layers(x)[1]
+        output[np.all(x < 0.1, axis=1)] = 0.0
+        return output
+
+
+def evaluate_quantization(network, images, labels, batch_size=1000):
+    """
+    Compare the float network and its int8 copy on a labelled set
+    (e.g. DatasetLoader.test_images). Returns a dict of metrics.
+    """
+    quantized = network.quantize()
+    results = {}
+    predictions = {}
+    for name, model in (("float", network), ("int8", quantized)):
+        start = time.perf_counter()
+        predicted = np.concatenate([
+            np.argmax(model.forward_batch(images[i:i + batch_size]), axis=1)
+            for i in range(0, len(images), batch_size)
+        ])
+        elapsed = time.perf_counter() - start
+        predictions[name] = predicted
+        results[f"{name}_accuracy"] = float(np.mean(predicted == labels))
+        results[f"{name}_ms_per_image"] = 1000.0 * elapsed / max(1, len(images))
+    
+    results["agreement"] = float(np.mean(predictions["float"] == predictions["int8"]))
+    snapshot = network.snapshot
+    results["float_bytes"] = sum(a.nbytes for a in (snapshot.weights1, snapshot.weights2,
+                                                    snapshot.bias1, snapshot.bias2))
+    results["int8_bytes"] = quantized.nbytes()
+    return results
@@ -0,0 +1,102 @@
+"""
+Segmentation of a drawing of several digits into network inputs.
+The raster is split into connected components (scipy.ndimage.label); parts
+of one digit that do not touch, such as the bar of a 5, are merged when their
+columns overlap. Every digit is then normalized the way MNIST was built:
+scaled to fit a 20x20 box and placed in a 28x28 image with its center of
+mass in the middle.
+"""
+
+import numpy as np
+from scipy import ndimage
+from src.core.preprocessing import normalize_raster
+from src.utils.config import DRAWING_CONFIG
+
+INPUT_SIZE = 28
+DIGIT_BOX = 20  # MNIST digits fit in 20x20 inside the 28x28 image
+
+
+def find_digits(raster, overlap=0.5):
+    """
+    Group the connected components of a raster into digits, left to right.
+    Components whose column ranges overlap by at least `overlap` of the
+    narrower one belong to the same digit. Returns the label image and the
+    labels of every digit.
+    """
+    labels, _ = ndimage.label(np.asarray(raster) > 0, structure=np.ones((3, 3)))  # 8-connected
+    
+    # Components by first column, merged into the digit before them when they overlap it
+    components = sorted((box[1].start, box[1].stop, label)
+                        for label, box in enumerate(ndimage.find_objects(labels), start=1))
+    groups = []
+    for left, right, label in components:
+        if groups:
+            group = groups[-1]
+            shared = min(right, group[1]) - max(left, group[0])
+            if shared >= overlap * min(right - left, group[1] - group[0]):
+                group[1] = max(right, group[1])
+                group[2].append(label)
+                continue
+        groups.append([left, right, [label]])
+    return labels, [members for _, _, members in groups]
+
+
+def normalize_digit(digit):
+    """
+    MNIST-style 28x28 image of one digit (float 0-1, cropped to its bounding
+    box): scaled to fit DIGIT_BOX, centered by its center of mass
+    """
+    zoom = DIGIT_BOX / max(digit.shape)
+    scaled = np.clip(ndimage.zoom(digit, zoom, order=1), 0.0, 1.0)
+    height, width = scaled.shape
+    
+    # Shift so the center of mass lands on the center of the image
+    center_y, center_x = ndimage.center_of_mass(scaled)
+    top = int(np.clip(np.rint((INPUT_SIZE - 1) / 2 - center_y), 0, INPUT_SIZE - height))
+    left = int(np.clip(np.rint((INPUT_SIZE - 1) / 2 - center_x), 0, INPUT_SIZE - width))
+    
+    image = np.zeros((INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+    image[top:top + height, left:left + width] = scaled
+    return image
+
+
+def segment_digits(raster, mask=None, min_pixels=None):
+    """
+    Split a raster (uint8 0-255 or float 0-1) of several digits into network
+    inputs, left to right. Each digit is normalized, then blurred and
+    thresholded as single drawings are (normalize_raster); digits with fewer
+    than min_pixels inked pixels are noise.
+    
+    `mask` can be a thinner rendering of the same strokes: the digits are then
+    found in it, so digits whose thick strokes touch stay apart, and every
+    pixel of the raster goes to the digit of the nearest mask pixel.
+    Returns (images (n, 28, 28), boxes), boxes being (row slice, column slice).
+    """
+    min_pixels = DRAWING_CONFIG["min_digit_pixels"] if min_pixels is None else min_pixels
+    raster = np.asarray(raster)
+    if raster.dtype == np.uint8:
+        raster = raster.astype(np.float32) / 255.0
+    labels, digits = find_digits(raster if mask is None else mask)
+    if mask is not None and digits:
+        # Label of the nearest mask pixel, for every pixel
+        nearest = ndimage.distance_transform_edt(labels == 0, return_indices=True)[1]
+        labels = labels[tuple(nearest)]
+    
+    images = []
+    boxes = []
+    for members in digits:
+        pixels = np.isin(labels, members) & (raster > 0)
+        if np.count_nonzero(pixels) < min_pixels:
+            continue
+        rows = np.flatnonzero(pixels.any(axis=1))
+        columns = np.flatnonzero(pixels.any(axis=0))
+        box = (slice(rows[0], rows[-1] + 1), slice(columns[0], columns[-1] + 1))
+        
+        # Only this digit's pixels: a neighbour may reach into its box
+        digit = np.where(pixels[box], raster[box], 0.0).astype(np.float32)
+        images.append(normalize_raster(normalize_digit(digit)))
+        boxes.append(box)
+    
+    if not images:
+        return np.zeros((0, INPUT_SIZE, INPUT_SIZE), dtype=np.float32), boxes
+    return np.stack(images), boxes
@@ -0,0 +1,21 @@
+"""
+Sparse first-layer product for mostly empty drawings.
+Only the rows of weights1 for non-zero pixels contribute to the hidden layer,
+so with little ink the product can skip most of the weight matrix.
+"""
+
+import numpy as np
+from src.utils.config import NETWORK_CONFIG
+
+
+def use_sparse_input(x, hidden_size):
+    """
+    Return the indices of the non-zero pixels of a flattened image if the
+    sparse first-layer product should be used for it, otherwise None.
+    """
+    if hidden_size < NETWORK_CONFIG["sparse_min_hidden_size"]:
+        return None
+    nonzero = np.flatnonzero(x)
+    if nonzero.size < NETWORK_CONFIG["sparse_input_density"] * x.size:
+        return nonzero
+    return None
@@ -0,0 +1,162 @@
+"""
+Training loop for SimpleNeuralNetwork.
+Holds out a validation split, evaluates it after every epoch, stops early
+once the validation loss stops improving and keeps the best weights.
+"""
+
+import time
+import numpy as np
+from src.utils.config import TRAINING_CONFIG
+
+
+class TrainingController:
+    """
+    Runs epochs of training over mini-batches (see SimpleNeuralNetwork.train_batch).
+    The network's weights are published after every epoch.
+
+    progress_callback(batches_done, total_batches) is called after every batch,
+    and training stops as soon as should_stop() returns True.
+
+    With snapshot_callback(snapshot, metrics), the weights are also published
+    during an epoch (e.g. to animate the visualizer): every `snapshot_interval`
+    batches, and at most `snapshot_rate` times per second, so publishing costs
+    one weight copy per interval at most. Epoch ends are always reported.
+    """
+    def __init__(self, network, images, labels, epochs=None, batch_size=None,
+                 validation_split=None, patience=None, min_delta=None, restore_best=None,
+                 progress_callback=None, should_stop=None, snapshot_callback=None,
+                 snapshot_interval=None, snapshot_rate=None):
+        self.network = network
+        self.epochs = epochs or TRAINING_CONFIG["epochs"]
+        self.batch_size = batch_size or TRAINING_CONFIG["batch_size"]
+        self.patience = patience if patience is not None else TRAINING_CONFIG["patience"]
+        self.min_delta = min_delta if min_delta is not None else TRAINING_CONFIG["min_delta"]
+        self.restore_best = restore_best if restore_best is not None else TRAINING_CONFIG["restore_best"]
+        self.progress_callback = progress_callback
+        self.should_stop = should_stop
+        self.snapshot_callback = snapshot_callback
+        self.snapshot_interval = snapshot_interval or TRAINING_CONFIG["snapshot_interval"]
+        self.snapshot_period = 1.0 / (snapshot_rate or TRAINING_CONFIG["snapshot_rate"])
+        self.last_snapshot_time = None
+        
+        # The last part of the data is held out for validation
+        if validation_split is None:
+            validation_split = TRAINING_CONFIG["validation_split"]
+        n_validation = int(len(images) * validation_split)
+        n_train = len(images) - n_validation
+        self.train_images, self.train_labels = images[:n_train], labels[:n_train]
+        self.val_images, self.val_labels = images[n_train:], labels[n_train:]
+        
+        self.batches_per_epoch = (n_train + self.batch_size - 1) // self.batch_size
+        self.total_batches = self.batches_per_epoch * self.epochs
+        
+        self.history = []  # One dict of metrics per completed epoch
+        self.best_loss = None
+        self.best_epoch = None
+        self.best_parameters = None
+        self.stopped_early = False
+        self.canceled = False
+    
+    def run(self):
+        """Train until the epoch budget, early stopping or cancellation; returns the history"""
+        batch_count = 0
+        epochs_without_improvement = 0
+        
+        for epoch in range(self.epochs):
+            start = time.perf_counter()
+            total_error = 0.0
+            n_seen = 0
+            
+            for i in range(0, len(self.train_images), self.batch_size):
+                if self.should_stop is not None and self.should_stop():
+                    self.canceled = True
+                    break
+                
+                batch_images = self.train_images[i:i+self.batch_size]
+                batch_labels = self.train_labels[i:i+self.batch_size]
+                
+                total_error += self.network.train_batch(batch_images, batch_labels) * len(batch_images)
+                n_seen += len(batch_images)
+                
+                batch_count += 1
+                if self.progress_callback is not None:
+                    self.progress_callback(batch_count, self.total_batches)
+                if self.snapshot_callback is not None and batch_count % self.snapshot_interval == 0:
+                    self.publish_live({"epoch": epoch + 1, "batches": batch_count,
+                                       "loss": total_error / n_seen})
+            
+            if n_seen == 0:
+                break
+            
+            # Make this epoch's weights visible to inference (and validation)
+            self.network.publish()
+            
+            elapsed = time.perf_counter() - start
+            metrics = {
+                "epoch": epoch + 1,
+                "loss": total_error / n_seen,  # Mean error per sample
+                "samples_per_second": n_seen / elapsed if elapsed > 0 else 0.0,
+                "seconds": elapsed
+            }
+            metrics.update(self.validate())
+            self.history.append(metrics)
+            self.report(metrics)
+            if self.snapshot_callback is not None:
+                self.snapshot_callback(self.network.snapshot, dict(metrics, batches=batch_count))
+            
+            # Keep the best epoch and stop once it is `patience` epochs old
+            if self.best_loss is None or metrics["val_loss"] < self.best_loss - self.min_delta:
+                self.best_loss = metrics["val_loss"]
+                self.best_epoch = metrics["epoch"]
+                self.best_parameters = self.network.get_parameters()
+                epochs_without_improvement = 0
+            else:
+                epochs_without_improvement += 1
+            
+            if self.canceled:
+                break
+            if len(self.val_images) > 0 and epochs_without_improvement >= self.patience:
+                self.stopped_early = True
+                print(f"Early stopping: no improvement since epoch {self.best_epoch}")
+                break
+        
+        if self.restore_best and self.best_parameters is not None and self.best_epoch != len(self.history):
+            print(f"Restoring weights from epoch {self.best_epoch}")
+            self.network.set_parameters(self.best_parameters)
+        return self.history
+    
+    def publish_live(self, metrics):
+        """Publish the weights mid-epoch, unless the last live snapshot is too recent"""
+        now = time.perf_counter()
+        if self.last_snapshot_time is not None and now - self.last_snapshot_time < self.snapshot_period:
+            return
+        self.last_snapshot_time = now
+        self.snapshot_callback(self.network.publish(), metrics)
+    
+    def validate(self):
+        """Loss (same error as training) and accuracy on the validation split"""
+        if len(self.val_images) == 0:
+            return {"val_loss": 0.0, "val_accuracy": 0.0}
+        
+        total_error = 0.0
+        correct = 0
+        for i in range(0, len(self.val_images), 1000):
+            images = self.val_images[i:i+1000]
+            labels = self.val_labels[i:i+1000]
+            output = self.network.forward_batch(images)
+            y_true = np.zeros_like(output)
+            y_true[np.arange(len(labels)), labels] = 1
+            total_error += np.sum(np.mean(np.abs(y_true - output), axis=1))
+            correct += np.sum(np.argmax(output, axis=1) == labels)
+        return {
+            "val_loss": total_error / len(self.val_images),
+            "val_accuracy": correct / len(self.val_images)
+        }
+    
+    def report(self, metrics):
+        """Print one line of metrics for an epoch"""
+        print(f"Epoch {metrics['epoch']}/{self.epochs}, "
+              f"Loss: {metrics['loss']:.4f}, "
+              f"Validation loss: {metrics['val_loss']:.4f}, "
+              f"Validation accuracy: {metrics['val_accuracy']:.2%}, "
+              f"{metrics['samples_per_second']:.0f} samples/s")
@@ -0,0 +1,224 @@
+"""
+Bulk scoring of an offline image corpus with a trained network.
+
+Inputs can be IDX image files (plain or .gz), .npy arrays of 28x28 images,
+PNG files or directories of PNG files. Images are decoded and normalized in a process
+pool (the same /255 normalization as DatasetLoader), scored in batches with
+forward_batch, and streamed to a CSV or NPY file. Only a bounded number of
+chunks is in flight at any time, so memory does not grow with the corpus.
+
+Usage:
+    python -m src.tools.bulk_score scans/ archive.idx3-ubyte.gz -o predictions.csv
+    python -m src.tools.bulk_score images.npy -o predictions.npy --workers 8
+"""
+
+import argparse
+import csv
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from src.core.dataset_cache import open_idx, read_into
+from src.core.ensemble import load_network
+from src.utils.config import MODEL_PATH
+
+# Output record of the NPY format
+PREDICTION_DTYPE = np.dtype([("digit", np.uint8), ("confidence", np.float32)])
+
+# Magic number of IDX files of unsigned bytes with 3 dimensions (images)
+IDX_IMAGES_MAGIC = 0x803
+
+
+def read_idx_header(f, path):
+    """(count, nrows, ncols) of an open IDX image file"""
+    header = f.read(16)
+    magic = struct.unpack(">I", header[:4])[0] if len(header) >= 4 else None
+    if magic != IDX_IMAGES_MAGIC:
+        raise ValueError(f"Not an IDX image file: {path}")
+    if len(header) < 16:
+        raise ValueError(f"Truncated IDX file: {path}")
+    return struct.unpack(">III", header[4:])
+
+
+def list_tasks(inputs, chunk_size):
+    """
+    Split the inputs into chunks of work.
+    Yields (names, task) where task is a picklable description for decode_chunk.
+    """
+    for path in inputs:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in names if name.lower().endswith(".png")
+            )
+            for start in range(0, len(files), chunk_size):
+                chunk = files[start:start + chunk_size]
+                yield chunk, ("png", chunk)
+        elif path.lower().endswith(".png"):
+            yield [path], ("png", [path])
+        elif path.endswith(".npy"):
+            count = len(np.load(path, mmap_mode='r'))
+            for start in range(0, count, chunk_size):
+                stop = min(start + chunk_size, count)
+                yield [f"{path}:{i}" for i in range(start, stop)], ("npy", path, start, stop)
+        elif path.endswith(".gz"):
+            # Compressed streams cannot be split: read sequentially, decode in the pool
+            with open_idx(path) as f:
+                count, nrows, ncols = read_idx_header(f, path)
+                for start in range(0, count, chunk_size):
+                    stop = min(start + chunk_size, count)
+                    data = bytearray((stop - start) * nrows * ncols)
+                    if not read_into(f, memoryview(data)):
+                        raise ValueError(f"Truncated IDX file: {path}")
+                    yield ([f"{path}:{i}" for i in range(start, stop)],
+                           ("bytes", bytes(data), (stop - start, nrows, ncols)))
+        else:
+            with open(path, 'rb') as f:
+                count, nrows, ncols = read_idx_header(f, path)
+            for start in range(0, count, chunk_size):
+                stop = min(start + chunk_size, count)
+                yield [f"{path}:{i}" for i in range(start, stop)], ("idx", path, start, stop)
+
+
+def count_images(inputs):
+    """Total number of images in the inputs (needed to size the NPY output)"""
+    total = 0
+    for path in inputs:
+        if os.path.isdir(path):
+            total += sum(name.lower().endswith(".png")
+                         for _, _, names in os.walk(path) for name in names)
+        elif path.lower().endswith(".png"):
+            total += 1
+        elif path.endswith(".npy"):
+            total += len(np.load(path, mmap_mode='r'))
+        else:
+            with open_idx(path) as f:
+                total += read_idx_header(f, path)[0]
+    return total
+
+
+def decode_chunk(task, invert=False):
+    """Decode one chunk of work to normalized float32 images (n, 784) (runs in the pool)"""
+    kind = task[0]
+    if kind == "png":
+        from PIL import Image
+        images = []
+        for filename in task[1]:
+            with Image.open(filename) as img:
+                img = img.convert("L")
+                if img.size != (28, 28):
+                    img = img.resize((28, 28), Image.BILINEAR)
+                images.append(np.asarray(img, dtype=np.uint8))
+        images = np.stack(images)
+    elif kind == "npy":
+        _, path, start, stop = task
+        images = np.asarray(np.load(path, mmap_mode='r')[start:stop])
+    elif kind == "bytes":
+        _, data, shape = task
+        images = np.frombuffer(data, dtype=np.uint8).reshape(shape)
+    else:
+        _, path, start, stop = task
+        with open(path, 'rb') as f:
+            count, nrows, ncols = read_idx_header(f, path)
+        images = np.memmap(path, dtype=np.uint8, mode='r', offset=16,
+                           shape=(count, nrows, ncols))[start:stop]
+
+    images = images.reshape(len(images), -1)
+    if images.shape[1] != 784:
+        raise ValueError(f"Expected 28x28 images, got {images.shape[1]} pixels")
+
+    # Same normalization as DatasetLoader (float arrays are assumed already in [0, 1])
+    if images.dtype == np.uint8:
+        images = images.astype(np.float32) / 255.0
+    else:
+        images = images.astype(np.float32)
+    if invert:
+        # Dark ink on light paper -> MNIST style light ink on black
+        images = 1.0 - images
+    return images
+
+
+def score(inputs, output, model_path=MODEL_PATH, workers=None, chunk_size=2048, invert=False):
+    """Score every image of the inputs and write the predictions; returns (count, seconds)"""
+    network = load_network(model_path)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers
+
+    is_npy = output.endswith(".npy")
+    if is_npy:
+        results = np.lib.format.open_memmap(output, mode='w+', dtype=PREDICTION_DTYPE,
+                                            shape=(count_images(inputs),))
+    else:
+        csv_file = open(output, 'w', newline='')
+        writer = csv.writer(csv_file)
+        writer.writerow(["index", "source", "digit", "confidence"])
+
+    start_time = time.perf_counter()
+    scored = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = []  # (names, future) in input order
+            tasks = list_tasks(inputs, chunk_size)
+            exhausted = False
+            while in_flight or not exhausted:
+                # Keep the pool busy while bounding memory
+                while not exhausted and len(in_flight) < max_in_flight:
+                    try:
+                        names, task = next(tasks)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    in_flight.append((names, pool.submit(decode_chunk, task, invert)))
+                if not in_flight:
+                    break
+
+                names, future = in_flight.pop(0)
+                probabilities = network.forward_batch(future.result())
+                digits = np.argmax(probabilities, axis=1)
+                confidences = probabilities[np.arange(len(digits)), digits]
+
+                if is_npy:
+                    results["digit"][scored:scored + len(digits)] = digits
+                    results["confidence"][scored:scored + len(digits)] = confidences
+                else:
+                    writer.writerows(
+                        (scored + i, name, int(digit), f"{confidence:.4f}")
+                        for i, (name, digit, confidence) in enumerate(zip(names, digits, confidences))
+                    )
+                scored += len(digits)
+
+                elapsed = time.perf_counter() - start_time
+                print(f"\r{scored} images, {scored / elapsed:.0f} images/s", end="", file=sys.stderr)
+    finally:
+        if is_npy:
+            results.flush()
+        else:
+            csv_file.close()
+
+    elapsed = time.perf_counter() - start_time
+    print(file=sys.stderr)
+    return scored, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score IDX files, .npy arrays, PNG files or PNG directories")
+    parser.add_argument("inputs", nargs="+", help="IDX image files (.gz allowed), .npy files, PNG files or directories of PNGs")
+    parser.add_argument("-o", "--output", required=True, help="Output .csv or .npy file")
+    parser.add_argument("--model", default=MODEL_PATH, help="Weights saved by the application")
+    parser.add_argument("--workers", type=int, default=None, help="Decoding processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=2048, help="Images per chunk of work")
+    parser.add_argument("--invert", action="store_true", help="Inputs are dark ink on a light background")
+    args = parser.parse_args()
+
+    count, elapsed = score(args.inputs, args.output, args.model, args.workers,
+                           args.chunk_size, args.invert)
+    print(f"Scored {count} images in {elapsed:.2f} s "
+          f"({count / elapsed if elapsed > 0 else 0:.0f} images/s) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+Local inference server for a trained network, without PyQt5.
+
+Serves HTTP/1.1 over TCP or a Unix socket:
+    GET  /health   -> {"status": "ok", "model_version": ...}
+    POST /predict  with one of
+        {"image": 28x28 array}               raw raster, integers 0-255 or floats 0-1
+        {"images": [28x28 array, ...]}       one or more rasters
+        {"strokes": [[[x, y], ...], ...], "width": 280, "height": 280}
+    -> {"predictions": [{"digit": d, "confidence": p, "probabilities": [...]}, ...]}
+    Rasters may add "scale", the value of full ink: it defaults to 255 for
+    integer arrays and 1 for floats, so 0/1 integer images need "scale": 1.
+    Invalid requests get a 400, failed predictions a 500, both with {"error": ...}.
+
+Concurrent requests are collected for up to batch_window_ms and scored
+with a single forward_batch call.
+
+Usage:
+    python -m src.tools.inference_server --model models/network.npz --port 8765
+    python -m src.tools.inference_server --unix /tmp/neurodraw.sock
+"""
+
+import argparse
+import asyncio
+import json
+import numpy as np
+
+from src.core.ensemble import load_network
+from src.core.preprocessing import normalize_raster, preprocess_strokes
+from src.utils.config import MODEL_PATH, SERVER_CONFIG, UI_CONFIG
+
+
+class MicroBatcher:
+    """
+    Groups concurrent predictions into one batched forward pass.
+    A batch is run when max_batch_size inputs are waiting or when the oldest
+    input has waited batch_window_ms.
+    """
+    def __init__(self, network, batch_window_ms=None, max_batch_size=None):
+        self.network = network
+        self.batch_window = (batch_window_ms if batch_window_ms is not None
+                             else SERVER_CONFIG["batch_window_ms"]) / 1000.0
+        self.max_batch_size = max_batch_size or SERVER_CONFIG["max_batch_size"]
+        self.pending = asyncio.Queue()
+        self.batch_sizes = []  # Size of every batch run (for monitoring and tests)
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def predict(self, images):
+        """Probabilities (n, 10) for normalized images (n, 28, 28)"""
+        futures = []
+        for image in images:
+            future = asyncio.get_running_loop().create_future()
+            await self.pending.put((image, future))
+            futures.append(future)
+        return np.stack(await asyncio.gather(*futures))
+
+    async def run(self):
+        """Batching loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    # Take whatever is already queued without waiting
+                    while len(batch) < self.max_batch_size and not self.pending.empty():
+                        batch.append(self.pending.get_nowait())
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # One matrix multiply for the whole batch
+            images = np.stack([image for image, _ in batch])
+            try:
+                probabilities = self.network.forward_batch(images)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batch_sizes.append(len(batch))
+            for (_, future), row in zip(batch, probabilities):
+                if not future.done():
+                    future.set_result(row)
+
+
+class InferenceServer:
+    """HTTP front-end of a MicroBatcher"""
+    def __init__(self, network, batch_window_ms=None, max_batch_size=None):
+        self.network = network
+        self.batcher = MicroBatcher(network, batch_window_ms, max_batch_size)
+        self.server = None
+
+    async def start(self, host=None, port=None, unix_path=None):
+        """Start listening; port 0 picks a free port (see self.port)"""
+        self.batcher.start()
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            host = host or SERVER_CONFIG["host"]
+            port = SERVER_CONFIG["port"] if port is None else port
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection (keep-alive)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self.route(method, path, body)
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        """Return (status line, JSON payload) for one request"""
+        if method == 'GET' and path == '/health':
+            return "200 OK", {"status": "ok", "model_version": self.network.snapshot.version}
+        if method != 'POST' or path != '/predict':
+            return "404 Not Found", {"error": f"Unknown endpoint {method} {path}"}
+
+        try:
+            images = parse_images(json.loads(body))
+        except (ValueError, KeyError, TypeError) as e:
+            return "400 Bad Request", {"error": str(e)}
+
+        try:
+            probabilities = await self.batcher.predict(images)
+        except Exception as e:
+            return "500 Internal Server Error", {"error": f"Prediction failed: {e}"}
+        return "200 OK", {"predictions": [
+            {
+                "digit": int(np.argmax(row)),
+                "confidence": float(np.max(row)),
+                "probabilities": [float(p) for p in row]
+            }
+            for row in probabilities
+        ]}
+
+
+def parse_images(request):
+    """Normalized (n, 28, 28) images from a /predict request body"""
+    if "strokes" in request:
+        width = request.get("width", UI_CONFIG["canvas_size"])
+        height = request.get("height", UI_CONFIG["canvas_size"])
+        for name, value in (("width", width), ("height", height)):
+            if not is_positive_number(value):
+                raise ValueError(f"Expected a positive {name}, got {value!r}")
+        strokes = request["strokes"]
+        if not isinstance(strokes, list) or not all(is_point_list(stroke) for stroke in strokes):
+            raise ValueError("Expected strokes as a list of [[x, y], ...] point lists")
+        return [preprocess_strokes(strokes, width, height)]
+
+    rasters = request["images"] if "images" in request else [request["image"]]
+    if not isinstance(rasters, list) or not rasters:
+        raise ValueError("Expected a non-empty list of images")
+    scale = request.get("scale")
+    if scale is not None and not is_positive_number(scale):
+        raise ValueError(f"Expected a positive scale, got {scale!r}")
+    
+    images = []
+    for raster in rasters:
+        raster = np.asarray(raster)
+        if raster.dtype.kind not in "biuf":
+            raise ValueError("Expected numeric 28x28 images")
+        if raster.size != 784:
+            raise ValueError(f"Expected 28x28 images, got shape {raster.shape}")
+        # Integer pixels are 0-255 by default, like the dataset files
+        full_ink = scale
+        if full_ink is None:
+            full_ink = 255 if raster.dtype.kind in "biu" else 1
+        raster = np.clip(raster.reshape(28, 28) / full_ink, 0.0, 1.0).astype(np.float32)
+        images.append(normalize_raster(raster))
+    return images
+
+
+def is_positive_number(value):
+    """True for a finite number > 0 (JSON booleans excluded)"""
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and np.isfinite(value) and value > 0)
+
+
+def is_point_list(stroke):
+    """True for a list of [x, y] points with numeric coordinates"""
+    return isinstance(stroke, list) and all(
+        isinstance(point, list) and len(point) == 2 and all(
+            isinstance(c, (int, float)) and not isinstance(c, bool) and np.isfinite(c) for c in point)
+        for point in stroke)
+
+
+async def serve(args):
+    network = load_network(args.model)
+    server = InferenceServer(network, args.batch_window_ms, args.max_batch_size)
+    await server.start(args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{server.port}"
+    print(f"Serving model {args.model} on {where}")
+    async with server.server:
+        await server.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local NeuroDraw inference server")
+    parser.add_argument("--model", default=MODEL_PATH, help="Weights saved by the application")
+    parser.add_argument("--host", default=SERVER_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=SERVER_CONFIG["port"])
+    parser.add_argument("--unix", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--batch-window-ms", type=float, default=SERVER_CONFIG["batch_window_ms"])
+    parser.add_argument("--max-batch-size", type=int, default=SERVER_CONFIG["max_batch_size"])
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
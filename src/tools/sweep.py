@@ -0,0 +1,221 @@
+"""
+Hyperparameter sweep for SimpleNeuralNetwork.
+
+Trains every variant of a grid (or a random sample of it) in a process pool.
+The normalized dataset is written once as float32 .npy files that all
+workers memory-map, so the pool shares one copy of it. Each variant is
+trained with TrainingController and evaluated on the test split, which the
+training never sees. Every variant starts from the same random seed, so
+differences come from the hyperparameters rather than the initialization.
+Results are ranked by accuracy and written as a table with training time
+and inference latency.
+
+Usage:
+    python -m src.tools.sweep --hidden-size 16 28 64 --learning-rate 0.05 0.1 --epochs 1 3
+    python -m src.tools.sweep --hidden-size 16 28 64 128 --learning-rate 0.01 0.03 0.1 0.3 \\
+        --conv-filters 0 8 --random 8 --output sweep.csv
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import numpy as np
+
+from src.core.neural_network import SimpleNeuralNetwork
+from src.core.trainer import TrainingController
+from src.utils.config import DATA_DIR, NETWORK_CONFIG, TRAINING_CONFIG
+
+# Columns of the results table
+COLUMNS = ["rank", "hidden_size", "learning_rate", "epochs", "batch_size", "conv_filters",
+           "test_accuracy", "val_accuracy", "epochs_run", "train_seconds",
+           "latency_ms", "batch_ms_per_image", "parameters"]
+
+
+def build_variants(space, n_random=None, seed=0):
+    """All combinations of the search space (a dict of lists), or n_random of them"""
+    names = sorted(space)
+    variants = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    if n_random is not None and n_random < len(variants):
+        variants = random.Random(seed).sample(variants, n_random)
+    return variants
+
+
+def export_dataset(data_path, directory, chunk_size=4096):
+    """
+    Write the normalized train and test splits to directory as .npy files.
+    Returns {split: (images path, labels path)}.
+    """
+    # Imported here so the pool workers do not load the Qt-based loader
+    from src.core.dataset_loader import DatasetLoader
+    loader = DatasetLoader(data_path)
+    paths = {}
+    for split in ("train", "test"):
+        raw = loader.get_raw_split(split)
+        images_path = os.path.join(directory, f"{split}-images.npy")
+        labels_path = os.path.join(directory, f"{split}-labels.npy")
+        images = np.lib.format.open_memmap(images_path, mode='w+', dtype=np.float32,
+                                           shape=(len(raw["images"]), raw["images"][0].size))
+        for start in range(0, len(images), chunk_size):
+            chunk = raw["images"][start:start + chunk_size]
+            images[start:start + len(chunk)] = chunk.reshape(len(chunk), -1) / np.float32(255.0)
+        images.flush()
+        del images
+        np.save(labels_path, np.asarray(raw["labels"]))
+        paths[split] = (images_path, labels_path)
+    return paths
+
+
+def measure_latency(network, images, repeats=200):
+    """Median single-image inference time and batched time per image, in ms"""
+    samples = images[:repeats]
+    timings = []
+    for image in samples:
+        start = time.perf_counter()
+        network.infer(image)
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    network.forward_batch(images[:1000])
+    batch_ms = 1000.0 * (time.perf_counter() - start) / max(1, min(1000, len(images)))
+    return 1000.0 * float(np.median(timings)), batch_ms
+
+
+def limit_threads():
+    """Pool initializer: one BLAS thread per worker, the pool already uses every core"""
+    # threadpoolctl comes with scikit-learn; it limits the BLAS numpy already loaded
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+
+def train_variant(variant, dataset_paths, seed=0):
+    """Train and evaluate one variant (runs in a pool worker); returns a result dict"""
+    np.random.seed(seed)
+    train_images = np.load(dataset_paths["train"][0], mmap_mode='r')
+    train_labels = np.load(dataset_paths["train"][1])
+    test_images = np.load(dataset_paths["test"][0], mmap_mode='r')
+    test_labels = np.load(dataset_paths["test"][1])
+
+    conv_layers = []
+    if variant["conv_filters"]:
+        conv_layers = [{"filters": variant["conv_filters"], "kernel_size": 5, "pool_size": 2}]
+    network = SimpleNeuralNetwork(variant["hidden_size"], variant["learning_rate"], conv_layers)
+    controller = TrainingController(network, train_images, train_labels,
+                                    epochs=variant["epochs"], batch_size=variant["batch_size"])
+
+    start = time.perf_counter()
+    history = controller.run()
+    train_seconds = time.perf_counter() - start
+
+    predictions = np.concatenate([
+        np.argmax(network.forward_batch(test_images[i:i + 1000]), axis=1)
+        for i in range(0, len(test_images), 1000)
+    ])
+    latency_ms, batch_ms = measure_latency(network, test_images)
+
+    result = dict(variant)
+    result.update({
+        "test_accuracy": float(np.mean(predictions == test_labels)),
+        "val_accuracy": history[-1]["val_accuracy"] if history else 0.0,
+        "epochs_run": len(history),
+        "train_seconds": train_seconds,
+        "latency_ms": latency_ms,
+        "batch_ms_per_image": batch_ms,
+        "parameters": sum(np.asarray(a).size for a in network.get_parameters().values())
+    })
+    return result
+
+
+def run_sweep(variants, data_path=DATA_DIR, workers=None, seed=0):
+    """Train all variants in a process pool; returns the results ranked by test accuracy"""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="neurodraw-sweep-") as directory:
+        dataset_paths = export_dataset(data_path, directory)
+
+        # Spawned workers start clean (no copied Qt or BLAS state)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=limit_threads) as pool:
+            futures = {
+                pool.submit(train_variant, variant, dataset_paths, seed): variant
+                for variant in variants
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"[{len(results)}/{len(variants)}] {format_variant(result)}: "
+                      f"accuracy {result['test_accuracy']:.2%}, "
+                      f"{result['train_seconds']:.1f} s training, {result['latency_ms']:.3f} ms/image")
+
+    results.sort(key=lambda r: (-r["test_accuracy"], r["latency_ms"]))
+    for rank, result in enumerate(results, 1):
+        result["rank"] = rank
+    return results
+
+
+def format_variant(variant):
+    return (f"hidden={variant['hidden_size']} lr={variant['learning_rate']} "
+            f"epochs={variant['epochs']} batch={variant['batch_size']} conv={variant['conv_filters']}")
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    return str(value)
+
+
+def print_table(results):
+    """Aligned text table of the ranked results"""
+    rows = [COLUMNS] + [[format_value(r[c]) for c in COLUMNS] for r in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(COLUMNS))]
+    for row in rows:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def write_csv(results, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep")
+    parser.add_argument("--data", default=DATA_DIR, help="Dataset folder (IDX files)")
+    parser.add_argument("--hidden-size", type=int, nargs="+", default=[NETWORK_CONFIG["hidden_size"]])
+    parser.add_argument("--learning-rate", type=float, nargs="+", default=[NETWORK_CONFIG["learning_rate"]])
+    parser.add_argument("--epochs", type=int, nargs="+", default=[TRAINING_CONFIG["epochs"]])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[TRAINING_CONFIG["batch_size"]])
+    parser.add_argument("--conv-filters", type=int, nargs="+", default=[0],
+                        help="Filters of a 5x5 convolution layer (0 = dense only)")
+    parser.add_argument("--random", type=int, default=None, help="Train N random variants instead of the full grid")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the ranked results to this CSV file")
+    args = parser.parse_args()
+
+    space = {
+        "hidden_size": args.hidden_size,
+        "learning_rate": args.learning_rate,
+        "epochs": args.epochs,
+        "batch_size": args.batch_size,
+        "conv_filters": args.conv_filters
+    }
+    variants = build_variants(space, args.random, args.seed)
+    print(f"Training {len(variants)} variants")
+
+    results = run_sweep(variants, args.data, args.workers, args.seed)
+    print()
+    print_table(results)
+    if args.output:
+        write_csv(results, args.output)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
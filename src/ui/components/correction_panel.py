@@ -0,0 +1,48 @@
+"""
+Correction panel component.
+Lets the user tell the network which digit the current drawing really is.
+"""
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel
+from PyQt5.QtCore import pyqtSignal
+
+class CorrectionPanel(QWidget):
+    digit_selected = pyqtSignal(int)
+    
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout(self)
+        
+        title = QLabel("Wrong prediction? Teach the right digit:")
+        title.setStyleSheet("font-weight: bold;")
+        layout.addWidget(title)
+        
+        buttons_layout = QHBoxLayout()
+        self.digit_buttons = []
+        for digit in range(10):
+            btn = QPushButton(str(digit))
+            btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #95a5a6;
+                    color: white;
+                    border: none;
+                    padding: 6px;
+                    border-radius: 4px;
+                    min-width: 20px;
+                    font-weight: bold;
+                }
+                QPushButton:hover {
+                    background-color: #3498db;
+                }
+            """)
+            btn.clicked.connect(lambda checked, d=digit: self.digit_selected.emit(d))
+            buttons_layout.addWidget(btn)
+            self.digit_buttons.append(btn)
+        layout.addLayout(buttons_layout)
+        
+        self.status = QLabel("")
+        self.status.setStyleSheet("color: #7f8c8d; font-size: 12px;")
+        layout.addWidget(self.status)
+    
+    def set_status(self, text):
+        self.status.setText(text)
@@ -1,65 +1,118 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QGridLayout
 from PyQt5.QtGui import QPixmap, QPainter, QImage
 from PyQt5.QtCore import Qt
-from src.core.dataset_loader import DatasetLoader
-import os
+import numpy as np
+from src.core.dataset_loader import get_dataset_loader, resize_images
+from src.utils.config import DATA_DIR, DATASET_CONFIG
 
 class DatasetPanel(QWidget):
-    def __init__(self):
+    def __init__(self, show_examples=True):
         super().__init__()
-        self.setMinimumSize(400, 400)
         self.layout = QVBoxLayout(self)
+        thumbnail_size = DATASET_CONFIG["thumbnail_size"]
         
+        if show_examples:
+            self.setMinimumSize(400, 400)
+            self.create_examples(thumbnail_size)
+        
+        # Training digits closest to the current drawing (see show_neighbors)
+        neighbors_title = QLabel("Similar training digits")
+        neighbors_title.setStyleSheet("font-weight: bold;")
+        self.layout.addWidget(neighbors_title)
+        
+        neighbors_layout = QGridLayout()
+        neighbors_layout.setSpacing(4)
+        self.layout.addLayout(neighbors_layout)
+        self.neighbor_labels = []
+        self.neighbor_captions = []
+        for j in range(DATASET_CONFIG["neighbors"]):
+            label = QLabel()
+            label.setFixedSize(thumbnail_size + 4, thumbnail_size + 4)
+            label.setStyleSheet("""
+                QLabel {
+                    border: 2px solid #333;
+                    background-color: black;
+                }
+            """)
+            label.setAlignment(Qt.AlignCenter)
+            caption = QLabel("")
+            caption.setAlignment(Qt.AlignCenter)
+            caption.setStyleSheet("font-size: 12px; font-weight: bold;")
+            neighbors_layout.addWidget(label, 0, j)
+            neighbors_layout.addWidget(caption, 1, j)
+            self.neighbor_labels.append(label)
+            self.neighbor_captions.append(caption)
+    
+    def create_examples(self, thumbnail_size):
+        """Grid of training examples: one row per digit"""
         # Title
         title = QLabel("Dataset Visualization")
         title.setAlignment(Qt.AlignCenter)
         title.setStyleSheet("font-size: 14px; font-weight: bold; margin: 10px;")
         self.layout.addWidget(title)
         
-        # Grid to display examples
+        # Grid to display examples: one row per digit
         grid_layout = QGridLayout()
+        grid_layout.setSpacing(4)
         self.layout.addLayout(grid_layout)
         
-        # Load dataset
-        data_folder = os.path.join(os.path.dirname(__file__), 'data')
-        self.dataset_loader = DatasetLoader(data_folder)
+        # Shared dataset (only the training split is read, on first use)
+        self.dataset_loader = get_dataset_loader(DATA_DIR)
+        
+        examples_per_digit = DATASET_CONFIG["examples_per_digit"]
         
-        # Create 10 labels for digits with enhanced style
+        # Thumbnails for every digit, resized together once
+        thumbnails = self.dataset_loader.get_digit_thumbnails(thumbnail_size, examples_per_digit)
+        
+        # Create labels for digits with enhanced style
         self.digit_labels = []
         for i in range(10):
-            container = QWidget()
-            container_layout = QVBoxLayout(container)
-            
-            # Label for image
-            label = QLabel()
-            label.setFixedSize(100, 100)
-            label.setStyleSheet("""
-                QLabel {
-                    border: 2px solid #333;
-                    background-color: black;
-                    padding: 5px;
-                }
-            """)
-            label.setAlignment(Qt.AlignCenter)
-            container_layout.addWidget(label)
-            
             # Label for number
             num_label = QLabel(str(i))
             num_label.setAlignment(Qt.AlignCenter)
             num_label.setStyleSheet("font-size: 12px; font-weight: bold;")
-            container_layout.addWidget(num_label)
-            
-            row = i // 5
-            col = i % 5
-            grid_layout.addWidget(container, row, col)
-            self.digit_labels.append(label)
+            grid_layout.addWidget(num_label, i, 0)
             
-            # Load and display image
-            pixmap = self.dataset_loader.get_digit_image(i)
-            if pixmap:
+            row_labels = []
+            for j in range(examples_per_digit):
+                # Label for image
+                label = QLabel()
+                label.setFixedSize(thumbnail_size + 4, thumbnail_size + 4)
+                label.setStyleSheet("""
+                    QLabel {
+                        border: 2px solid #333;
+                        background-color: black;
+                    }
+                """)
+                label.setAlignment(Qt.AlignCenter)
+                
+                # Display image
+                pixmap = self.to_pixmap(thumbnails[i, j])
                 label.setPixmap(pixmap)
-            
-            # Add digit number
-            num_label = QLabel(str(i))
-            num_label.setAlignment(Qt.AlignCenter)
-            grid_layout.addWidget(num_label, row+2, col) 
\ No newline at end of file
+                
+                grid_layout.addWidget(label, i, j + 1)
+                row_labels.append(label)
+            self.digit_labels.append(row_labels)
+    
+    def show_neighbors(self, images, labels):
+        """Display normalized training images (nearest first) with their digits"""
+        thumbnail_size = DATASET_CONFIG["thumbnail_size"]
+        thumbnails = []
+        if len(images) > 0:
+            # All neighbors resized in one pass
+            resized = resize_images(np.asarray(images).reshape(len(images), 28, 28), thumbnail_size)
+            thumbnails = np.rint(resized * 255.0).clip(0, 255).astype(np.uint8)
+        
+        for j, (label, caption) in enumerate(zip(self.neighbor_labels, self.neighbor_captions)):
+            if j < len(thumbnails):
+                label.setPixmap(self.to_pixmap(thumbnails[j]))
+                caption.setText(str(int(labels[j])))
+            else:
+                label.clear()
+                caption.setText("")
+    
+    def to_pixmap(self, img_data):
+        """Convert a uint8 thumbnail to QPixmap"""
+        height, width = img_data.shape
+        qimg = QImage(np.ascontiguousarray(img_data).data, width, height, width, QImage.Format_Grayscale8)
+        return QPixmap.fromImage(qimg)
@@ -9,6 +9,7 @@ from PyQt5.QtCore import Qt, QPoint, QRect
 import numpy as np
 from PyQt5.QtCore import pyqtSignal
 from src.ui.components.drawing_history import DrawingHistory
+from src.core.preprocessing import normalize_raster
 from src.utils.config import DRAWING_CONFIG
 
 class DrawingPanel(QWidget):
@@ -85,8 +86,10 @@ class DrawingPanel(QWidget):
         self.clear_btn = QPushButton("Clear")
         self.undo_btn = QPushButton("Undo")
         self.redo_btn = QPushButton("Redo")
+        self.multi_digit_btn = QPushButton("Multi-digit")
+        self.multi_digit_btn.setCheckable(True)
         
-        for btn in [self.clear_btn, self.undo_btn, self.redo_btn]:
+        for btn in [self.clear_btn, self.undo_btn, self.redo_btn, self.multi_digit_btn]:
             btn.setStyleSheet("""
                 QPushButton {
                     background-color: #4CAF50;
@@ -96,6 +99,9 @@ class DrawingPanel(QWidget):
                     border-radius: 4px;
                     min-width: 80px;
                 }
+                QPushButton:checked {
+                    background-color: #3498db;
+                }
                 QPushButton:disabled {
                     background-color: #cccccc;
                 }
@@ -109,6 +115,7 @@ class DrawingPanel(QWidget):
         self.clear_btn.clicked.connect(self.canvas.clear)
         self.undo_btn.clicked.connect(self.canvas.undo)
         self.redo_btn.clicked.connect(self.canvas.redo)
+        self.multi_digit_btn.toggled.connect(self.canvas.set_multi_digit)
         
         # Initial button states
         self.update_button_states()
@@ -133,21 +140,37 @@ class Canvas(QWidget):
         self.strokes = []  # List of strokes (each stroke is a list of points)
         self.current_stroke = []  # Points of the current stroke
         self.grid_size = 28
-        self.cell_size = self.width() / self.grid_size
+        self.cell_size = self.height() / self.grid_size
+        self.columns = self.grid_size  # Raster columns, more in multi-digit mode
+        self.multi_digit = False
+        
+        # Streaming stroke simplification (see add_point): points may move
+        # the stroke by at most a fraction of one 28x28 cell
+        self.simplify_tolerance = DRAWING_CONFIG["simplify_tolerance"] * self.cell_size
+        self.simplify_window = DRAWING_CONFIG["simplify_window"]
+        self.dropped_points = []  # Raw points merged into the current last segment
         self.history = DrawingHistory()
         
+        # Cached renders: grid + frame, and grid + frame + completed strokes
+        self.background_pixmap = None
+        self.strokes_pixmap = None
+        
         # Set black background
         self.setAutoFillBackground(True)
         palette = self.palette()
         palette.setColor(self.backgroundRole(), Qt.black)
         self.setPalette(palette)
+        
+        # paintEvent always covers the dirty rect with the cached pixmap
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
     
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             self.drawing = True
             self.last_point = event.pos()
             self.current_stroke = [self.last_point]  # Start a new stroke
-            self.update()
+            self.dropped_points = []
+            self.update(self.segment_rect(self.last_point, self.last_point))
     
     def mouseMoveEvent(self, event):
         if self.drawing:
@@ -157,18 +180,20 @@ class Canvas(QWidget):
                 dy = current_point.y() - self.last_point.y()
                 distance = ((dx ** 2) + (dy ** 2)) ** 0.5
                 
-                if distance > 5:
-                    steps = int(distance / 5)
-                    for i in range(1, steps + 1):
-                        t = i / steps
-                        x = self.last_point.x() + dx * t
-                        y = self.last_point.y() + dy * t
-                        self.current_stroke.append(QPoint(int(x), int(y)))
-                else:
-                    self.current_stroke.append(current_point)
+                # Intermediate points every 5 px keep fast strokes rasterized
+                # as before; add_point drops those that change nothing
+                steps = max(1, int(distance / 5))
+                dirty = QRect()
+                for i in range(1, steps + 1):
+                    t = i / steps
+                    x = self.last_point.x() + dx * t
+                    y = self.last_point.y() + dy * t
+                    dirty = dirty.united(self.add_point(QPoint(int(x), int(y))))
+                
+                # Only the area around the changed segments needs repainting
+                self.update(dirty)
                 
             self.last_point = current_point
-            self.update()
             normalized = self.get_normalized_image()
             self.image_updated.emit(normalized)
     
@@ -179,6 +204,7 @@ class Canvas(QWidget):
                 self.strokes.append(self.current_stroke)
                 self.current_stroke = []
                 self.history.add_state(self.strokes)
+                self.invalidate_strokes_cache()
                 normalized = self.get_normalized_image()
                 self.image_updated.emit(normalized)
     
@@ -187,15 +213,23 @@ class Canvas(QWidget):
         self.strokes = []
         self.current_stroke = []
         self.history = DrawingHistory()
-        self.update()
-        empty_image = np.zeros((28, 28), dtype=np.float32)
-        self.image_updated.emit(empty_image)
+        self.invalidate_strokes_cache()
+        self.image_updated.emit(self.get_normalized_image())
+    
+    def set_multi_digit(self, enabled):
+        """Switch between one digit (280x280) and a wider canvas for several digits"""
+        self.multi_digit = enabled
+        width = DRAWING_CONFIG["multi_digit_width"] if enabled else self.height()
+        self.setFixedSize(width, self.height())
+        self.columns = int(width / self.cell_size)
+        self.background_pixmap = None
+        self.clear()
     
     def undo(self):
         strokes = self.history.undo()
         if strokes is not None:
             self.strokes = [stroke.copy() for stroke in strokes]
-            self.update()
+            self.invalidate_strokes_cache()
             normalized = self.get_normalized_image()
             self.image_updated.emit(normalized)
     
@@ -203,12 +237,74 @@ class Canvas(QWidget):
         strokes = self.history.redo()
         if strokes is not None:
             self.strokes = [stroke.copy() for stroke in strokes]
-            self.update()
+            self.invalidate_strokes_cache()
             normalized = self.get_normalized_image()
             self.image_updated.emit(normalized)
     
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def add_point(self, point):
+        """
+        Append a point to the current stroke, simplifying as points arrive.
+        The last point of the stroke always follows the cursor. When the
+        straight segment from the previous vertex to the new point can stand
+        for every raw point since that vertex, the last point is moved instead
+        of keeping a new vertex (a streaming Douglas-Peucker test over at most
+        simplify_window points). A point can be dropped if it is within
+        simplify_tolerance of the segment on screen, and if in the 28x28 raster
+        (see get_normalized_image) it falls on one of the segment's end pixels,
+        so the network input is unchanged. Returns the area to repaint.
+        """
+        stroke = self.current_stroke
+        if len(stroke) < 2:
+            stroke.append(point)
+            return self.segment_rect(stroke[0], point)
+        
+        anchor, end = stroke[-2], stroke[-1]
+        candidates = self.dropped_points + [end]
+        grid_ends = (self.grid_point(anchor), self.grid_point(point))
+        if len(candidates) <= self.simplify_window and all(
+                self.grid_point(p) in grid_ends
+                and self.segment_distance(p, anchor, point) <= self.simplify_tolerance
+                for p in candidates):
+            # The segment anchor -> point replaces every point since the anchor
+            self.dropped_points = candidates
+            stroke[-1] = point
+            return self.segment_rect(anchor, end).united(self.segment_rect(anchor, point))
+        
+        # The previous end becomes a vertex
+        stroke.append(point)
+        self.dropped_points = []
+        return self.segment_rect(end, point)
+    
+    def grid_point(self, point):
+        """Raster coordinates of a canvas point (truncated, as in get_normalized_image)"""
+        scale = self.grid_size / self.height()
+        return int(point.x() * scale), int(point.y() * scale)
+    
+    @staticmethod
+    def segment_distance(p, a, b):
+        """Distance from point p to the segment a-b"""
+        dx, dy = b.x() - a.x(), b.y() - a.y()
+        length = dx * dx + dy * dy
+        t = 0.0
+        if length > 0:
+            t = min(1.0, max(0.0, ((p.x() - a.x()) * dx + (p.y() - a.y()) * dy) / length))
+        return ((p.x() - a.x() - t * dx) ** 2 + (p.y() - a.y() - t * dy) ** 2) ** 0.5
+    
+    def segment_rect(self, p1, p2):
+        """Returns the widget area touched by a stroke segment between two points"""
+        margin = max(14, DRAWING_CONFIG["default_brush_size"]) // 2 + 2
+        return QRect(p1, p2).normalized().adjusted(-margin, -margin, margin, margin)
+    
+    def invalidate_strokes_cache(self):
+        """Drops the completed-strokes render and schedules a full repaint"""
+        self.strokes_pixmap = None
+        self.update()
+    
+    def render_background(self):
+        """Renders the grid and frame once"""
+        pixmap = QPixmap(self.size())
+        pixmap.fill(Qt.black)
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.Antialiasing)
         
         # Draw grid
@@ -217,18 +313,22 @@ class Canvas(QWidget):
         painter.setPen(pen)
         
         # More visible grid
-        for i in range(self.grid_size):
+        for i in range(max(self.grid_size, self.columns)):
             x = i * self.cell_size
             y = i * self.cell_size
-            painter.drawLine(int(x), 0, int(x), self.height())
-            painter.drawLine(0, int(y), self.width(), int(y))
+            if i < self.columns:
+                painter.drawLine(int(x), 0, int(x), self.height())
+            if i < self.grid_size:
+                painter.drawLine(0, int(y), self.width(), int(y))
             
             if i % 7 == 0:
                 pen.setWidth(2)
                 pen.setColor(QColor(60, 60, 60))
                 painter.setPen(pen)
-                painter.drawLine(int(x), 0, int(x), self.height())
-                painter.drawLine(0, int(y), self.width(), int(y))
+                if i < self.columns:
+                    painter.drawLine(int(x), 0, int(x), self.height())
+                if i < self.grid_size:
+                    painter.drawLine(0, int(y), self.width(), int(y))
                 pen.setWidth(1)
                 pen.setColor(QColor(40, 40, 40))
                 painter.setPen(pen)
@@ -237,68 +337,94 @@ class Canvas(QWidget):
         pen = QPen(Qt.white, 2)
         painter.setPen(pen)
         painter.drawRect(0, 0, self.width()-1, self.height()-1)
+        painter.end()
+        return pixmap
+    
+    def render_strokes(self):
+        """Renders the background plus all completed strokes"""
+        if self.background_pixmap is None:
+            self.background_pixmap = self.render_background()
         
-        # Draw all completed strokes
+        pixmap = QPixmap(self.background_pixmap)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
         for stroke in self.strokes:
             if stroke:
-                pen = QPen()
-                pen.setWidth(14)
-                pen.setColor(QColor('white'))
-                pen.setCapStyle(Qt.RoundCap)
-                pen.setJoinStyle(Qt.RoundJoin)
-                painter.setPen(pen)
-                
-                path = QPainterPath()
-                path.moveTo(stroke[0])
-                for point in stroke[1:]:
-                    path.lineTo(point)
-                painter.drawPath(path)
-                
-                # Brilliance effect
-                pen.setWidth(10)
-                pen.setColor(QColor(220, 220, 255))
-                painter.setPen(pen)
-                painter.drawPath(path)
+                self.draw_stroke(painter, stroke, 14)
+        painter.end()
+        return pixmap
+    
+    def draw_stroke(self, painter, stroke, width):
+        """Draws one stroke with its brilliance effect"""
+        pen = QPen()
+        pen.setWidth(width)
+        pen.setColor(QColor('white'))
+        pen.setCapStyle(Qt.RoundCap)
+        pen.setJoinStyle(Qt.RoundJoin)
+        painter.setPen(pen)
+        
+        path = QPainterPath()
+        path.moveTo(stroke[0])
+        for point in stroke[1:]:
+            path.lineTo(point)
+        painter.drawPath(path)
+        
+        # Brilliance effect
+        pen.setWidth(10)
+        pen.setColor(QColor(220, 220, 255))
+        painter.setPen(pen)
+        painter.drawPath(path)
+    
+    def paintEvent(self, event):
+        if self.strokes_pixmap is None:
+            self.strokes_pixmap = self.render_strokes()
+        
+        painter = QPainter(self)
+        
+        # Grid, frame and completed strokes come from the cache
+        dirty = event.rect()
+        painter.drawPixmap(dirty, self.strokes_pixmap, dirty)
         
         # Draw current stroke
         if self.current_stroke:
-            pen = QPen()
-            pen.setWidth(DRAWING_CONFIG["default_brush_size"])
-            pen.setColor(QColor('white'))
-            pen.setCapStyle(Qt.RoundCap)
-            pen.setJoinStyle(Qt.RoundJoin)
-            painter.setPen(pen)
-            
-            path = QPainterPath()
-            path.moveTo(self.current_stroke[0])
-            for point in self.current_stroke[1:]:
-                path.lineTo(point)
-            painter.drawPath(path)
-            
-            # Brilliance effect
-            pen.setWidth(10)
-            pen.setColor(QColor(220, 220, 255))
-            painter.setPen(pen)
-            painter.drawPath(path)
+            painter.setRenderHint(QPainter.Antialiasing)
+            self.draw_stroke(painter, self.current_stroke, DRAWING_CONFIG["default_brush_size"])
     
     def get_normalized_image(self):
-        """Converts the drawing to a normalized image"""
+        """
+        Converts the drawing to a normalized 28x28 image. In multi-digit mode,
+        returns one such image per digit instead, (n, 28, 28) left to right
+        (see segment_digits).
+        """
+        if self.multi_digit:
+            if not self.strokes and not self.current_stroke:
+                return np.zeros((0, 28, 28), dtype=np.float32)
+            # Imported on first use: scipy is only needed in this mode
+            from src.core.segmentation import segment_digits
+            # Digits are told apart on a one-pixel-wide rendering, where they touch less
+            return segment_digits(self.get_raster(), self.get_raster(pen_width=1))[0]
+        
         # If no strokes have been drawn, return an empty image
         if not self.strokes and not self.current_stroke:
             return np.zeros((28, 28), dtype=np.float32)
         
-        image = QImage(28, 28, QImage.Format_Grayscale8)
+        # Normalize, blur and threshold (shared with the headless tools)
+        return normalize_raster(self.get_raster())
+    
+    def get_raster(self, pen_width=3):
+        """Draws the strokes on the 28-row raster (one pixel per grid cell), uint8"""
+        image = QImage(self.columns, self.grid_size, QImage.Format_Grayscale8)
         image.fill(Qt.black)
         
         painter = QPainter(image)
         painter.setRenderHint(QPainter.Antialiasing, False)
         
-        # Scale points to 28x28
-        scale = 28 / self.width()
+        # Scale points to the grid
+        scale = self.grid_size / self.height()
         
         # Draw with a thicker pen to better match the MNIST dataset
         pen = QPen()
-        pen.setWidth(3)
+        pen.setWidth(pen_width)
         pen.setColor(QColor('white'))
         pen.setCapStyle(Qt.RoundCap)
         pen.setJoinStyle(Qt.RoundJoin)
@@ -335,22 +461,7 @@ class Canvas(QWidget):
         
         painter.end()
         
-        # Convert to numpy array
+        # Convert to numpy array (rows may be padded)
         ptr = image.bits()
         ptr.setsize(image.byteCount())
-        arr = np.array(ptr).reshape(28, 28)
-        
-        # Normalize and add slight blur for softening edges
-        from scipy.ndimage import gaussian_filter
-        normalized = arr.astype(np.float32) / 255.0
-        normalized = gaussian_filter(normalized, sigma=0.5)
-        
-        # Apply higher threshold to eliminate noise
-        threshold = 0.15
-        normalized[normalized < threshold] = 0.0
-        
-        # Additional check: if the image is almost empty, consider it empty
-        if np.sum(normalized) < 1.0:
-            return np.zeros((28, 28), dtype=np.float32)
-        
-        return normalized 
\ No newline at end of file
+        return np.array(ptr).reshape(self.grid_size, image.bytesPerLine())[:, :self.columns]
@@ -0,0 +1,32 @@
+"""
+Loading screen component.
+Shown as soon as Qt is up, while the main window and its modules are imported.
+Only depends on PyQt5 so it can be displayed before anything heavy is loaded.
+"""
+
+from PyQt5.QtWidgets import QLabel
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from src.ui.styles.style_constants import BACKGROUND_COLOR, SECONDARY_COLOR
+
+class LoadingScreen(QLabel):
+    # Emitted once, after the first frame has been painted
+    painted = pyqtSignal()
+
+    def __init__(self):
+        super().__init__("NeuroDraw\n\nLoading...")
+        self.setWindowTitle("NeuroDraw - Neural Network Digit Recognition")
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet(f"""
+            background-color: {BACKGROUND_COLOR};
+            color: {SECONDARY_COLOR};
+            font-size: 24px;
+            font-weight: bold;
+        """)
+        self.has_painted = False
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.has_painted:
+            self.has_painted = True
+            self.painted.emit()
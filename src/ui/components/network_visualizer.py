@@ -4,12 +4,16 @@ Displays the neural network structure and activations.
 """
 
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QPen, QColor, QBrush, QFont, QLinearGradient, QPainterPath
-from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import (QPainter, QPen, QColor, QBrush, QFont, QLinearGradient, QPainterPath,
+                         QImage, qRgb)
+from PyQt5.QtCore import Qt, QPointF, QRectF, QLineF, pyqtSignal
 import numpy as np
 from src.utils.config import VISUALIZATION_CONFIG
+from src.utils.ring_buffer import RingBuffer
 
 class NetworkVisualizer(QWidget):
+    digit_selected = pyqtSignal(int)  # Digit of the strip clicked (multi-digit mode)
+    
     def __init__(self, network):
         super().__init__()
         self.setMinimumSize(900, 500)  # Increase minimum size
@@ -28,14 +32,50 @@ class NetworkVisualizer(QWidget):
         self.output_x = None
         
         self.network = network
+        self.result = None  # Last InferenceResult (activations and the weights used)
         self.predictions = np.zeros(10)
         self.current_input = np.zeros(784)
+        self.input_image = self.build_input_image(self.current_input)
+        self.feature_images = []  # QImage tiles per convolution layer (feature-map panel)
+        self.show_saliency = VISUALIZATION_CONFIG.get("show_saliency", True)
+        self.saliency_image = None  # 28x28 overlay of the input grid, one per prediction
+        self.frame = None  # What the last prediction shows, at drawing resolution (see frame_state)
+        
+        # Multi-digit mode: every digit with its prediction in a strip under
+        # the network, which shows the selected one (see update_digits)
+        self.digit_images = None  # (n, 28, 28), None outside multi-digit mode
+        self.digit_probabilities = None  # (n, 10)
+        self.digit_thumbnails = []
+        self.selected_digit = 0
+        self.digits_state = None
         
         # Colors
         self.bg_color = QColor(240, 240, 245)
         self.inactive_color = QColor(200, 200, 220)
         self.active_color = QColor(65, 105, 225)
         
+        # Heatmap tiles: red (negative) -> white (0) -> blue (positive) in
+        # levels 0-254, and level 255 for the gaps between tiles
+        self.heatmap_colors = []
+        for level in range(255):
+            t = (level - 127) / 127.0
+            if t < 0:
+                self.heatmap_colors.append(qRgb(255, int(255 * (1 + t)), int(255 * (1 + t))))
+            else:
+                self.heatmap_colors.append(qRgb(int(255 * (1 - t)), int(255 * (1 - t)), 255))
+        self.heatmap_colors.append(self.bg_color.rgb())
+        
+        # Display mode (see VisualizationControls) and the last render of each
+        # tile mode with the object it was computed from
+        self.display_mode = "network"
+        self.mode_images = {}
+        
+        # Feature maps: white (inactive) to active color
+        self.feature_colors = [
+            qRgb(255 - (255 - 65) * i // 255, 255 - (255 - 105) * i // 255, 255 - (255 - 225) * i // 255)
+            for i in range(256)
+        ]
+        
         # Probability bar style
         self.probability_style = """
             QProgressBar {
@@ -54,9 +94,23 @@ class NetworkVisualizer(QWidget):
             }
         """
         
-        # Prediction history for animation
-        self.prediction_history = {i: [] for i in range(10)}
+        # Prediction history for animation (one row of 10 probabilities per update)
         self.max_history_size = VISUALIZATION_CONFIG.get("max_history_size", 1000)  # Default limit
+        self.prediction_history = RingBuffer(self.max_history_size, 10, dtype=np.float32)
+        
+        # Connection rendering: at most max_connection_lines lines per frame,
+        # grouped by sign and magnitude so each group shares one pen
+        self.max_connection_lines = VISUALIZATION_CONFIG.get("max_connection_lines", 200)
+        self.connection_levels = VISUALIZATION_CONFIG.get("connection_levels", 4)
+        self.connection_pens = {}
+        for positive in (True, False):
+            for level in range(self.connection_levels):
+                strength = (level + 1) / self.connection_levels
+                if positive:
+                    color = QColor(0, 0, 255, int(40 + 160 * strength))
+                else:
+                    color = QColor(255, 0, 0, int(40 + 160 * strength))
+                self.connection_pens[(positive, level)] = QPen(color, 1 + 2 * strength)
         
         # Colors for different confidence levels
         self.confidence_colors = {
@@ -76,10 +130,13 @@ class NetworkVisualizer(QWidget):
         w = self.width()
         h = self.height()
         
-        # Horizontal layer positions
-        self.input_x = self.margin_h + 100  # More space for input
-        self.hidden_x = w // 2
-        self.output_x = w - self.margin_h - self.output_width - 50
+        if self.display_mode != "network":
+            self.draw_tiles(painter, w, h)
+            return
+        
+        # Layer positions, and the parts of the scene that need repainting
+        regions = self.layout_regions(w, h)
+        dirty = event.region()
         
         # Available height for neurons
         available_height = h - 2 * self.margin_v
@@ -94,15 +151,83 @@ class NetworkVisualizer(QWidget):
         painter.drawText(int(self.hidden_x - 50), 30, "Hidden Layer")
         painter.drawText(int(self.output_x - 50), 30, "Output")
         
+        # Ensembles: weights and activations are the first member's, the bars the average
+        ensemble_size = getattr(self.network, "ensemble_size", 1)
+        if ensemble_size > 1:
+            font.setPointSize(9)
+            font.setBold(False)
+            painter.setFont(font)
+            painter.drawText(int(self.hidden_x - 50), 48, f"Member 1 of {ensemble_size} (bars: average)")
+        
         # Draw input as a centered 28x28 grid
-        grid_size = 140  # Total grid size
+        grid = regions["grid"]
+        grid_size = int(grid.width())  # Total grid size
         cell_size = grid_size / 28  # Size of each cell
+        start_x, start_y = grid.left(), grid.top()
+        
+        if dirty.intersects(regions["input"]):
+            self.draw_input_grid(painter, start_x, start_y, grid_size, cell_size)
+        
+        # Everything below comes from one inference result, so the weights
+        # and activations drawn always belong together
+        result = self.result
+        has_activations = result is not None and result.hidden_activations is not None
+        
+        # Important connections
+        if has_activations:
+            snapshot = result.snapshot
+            hidden_activations = result.hidden_activations[0]
+            output_activations = result.output_activations[0]  # Same network as weights2
+            top_hidden = np.argsort(hidden_activations)[-5:]  # Top 5 hidden neurons
+            
+            if dirty.intersects(regions["connections"]):
+                if result.feature_maps is not None:
+                    # With convolution layers the hidden layer reads feature maps, not pixels
+                    self.draw_feature_maps(painter, h)
+                else:
+                    # Input -> hidden layer connections: the strongest input * weight
+                    # contributions, drawn one bucket (shared pen) at a time
+                    for bucket, lines in self.compute_connection_lines(snapshot.weights1, start_x, start_y, cell_size, h).items():
+                        painter.setPen(self.connection_pens[bucket])
+                        painter.drawLines(lines)
+            
+            # Hidden layer -> output connections
+            if dirty.intersects(regions["links"]):
+                for h_idx in top_hidden:
+                    hid_y = h * 0.2 + (h * 0.6 * h_idx / (self.network.hidden_size-1))
+                    for o_idx in range(self.network.output_size):
+                        if float(output_activations[o_idx]) > 0.1:  # Show only significant outputs
+                            out_y = h * 0.2 + (h * 0.6 * o_idx / (self.network.output_size-1))
+                            weight = float(snapshot.weights2[h_idx, o_idx])
+                            if weight > 0:
+                                color = QColor(0, 0, 255, int(abs(weight * 200)))
+                            else:
+                                color = QColor(255, 0, 0, int(abs(weight * 200)))
+                            pen = QPen(color, max(1, int(abs(weight * 3))))
+                            painter.setPen(pen)
+                            painter.drawLine(int(self.hidden_x), int(hid_y), int(self.output_x), int(out_y))
         
-        # Calculate for vertical centering
-        total_height = h * 0.6  # Available height for neurons
-        start_y = (h - grid_size) / 2  # Center vertically
-        start_x = self.input_x - grid_size/2  # Center horizontally
+        # Hidden neurons
+        if has_activations and dirty.intersects(regions["hidden"]):
+            for i in range(self.network.hidden_size):
+                y = h * 0.2 + (h * 0.6 * i / (self.network.hidden_size-1))
+                activation = float(hidden_activations[i])
+                color = QColor(0, 0, 255, int(activation * 255))
+                painter.setBrush(QBrush(color))
+                painter.setPen(Qt.black)
+                painter.drawEllipse(QPointF(self.hidden_x, y), self.neuron_radius/2, self.neuron_radius/2)
         
+        # Output neurons with enhanced visualization
+        for i in range(self.network.output_size):
+            if dirty.intersects(regions["outputs"][i]):
+                self.draw_output_bar(painter, i, h)
+        
+        # Digits of a multi-digit drawing
+        if self.digit_images is not None and dirty.intersects(regions["digits"]):
+            self.draw_digits(painter, regions["digits"])
+    
+    def draw_input_grid(self, painter, start_x, start_y, grid_size, cell_size):
+        """Input pixels on a 28x28 grid, with the saliency overlay"""
         # Grid frame with shadow
         shadow_offset = 3
         shadow_color = QColor(0, 0, 0, 30)
@@ -120,30 +245,8 @@ class NetworkVisualizer(QWidget):
         painter.setPen(QPen(QColor("#3498db"), 2))  # Blue border
         painter.drawRect(int(start_x), int(start_y), grid_size, grid_size)
         
-        # Grid cells
-        for i in range(28):
-            for j in range(28):
-                idx = i * 28 + j
-                x = start_x + j * cell_size
-                y = start_y + i * cell_size
-                
-                # Draw background grid
-                if (i + j) % 2 == 0:
-                    painter.fillRect(
-                        int(x), int(y),
-                        int(cell_size), int(cell_size),
-                        QColor(248, 249, 250)
-                    )
-                
-                # Draw active pixel
-                activation = float(self.current_input[idx])
-                if activation > 0:
-                    color = QColor(52, 152, 219, int(activation * 255))  # Blue with transparency
-                    painter.fillRect(
-                        int(x), int(y),
-                        int(cell_size), int(cell_size),
-                        color
-                    )
+        # Grid cells, one image pixel per cell (see build_input_image)
+        painter.drawImage(QRectF(start_x, start_y, grid_size, grid_size), self.input_image)
         
         # Thinner grid lines
         painter.setPen(QPen(QColor(222, 226, 230), 0.5))
@@ -161,137 +264,528 @@ class NetworkVisualizer(QWidget):
             painter.drawLine(int(x), int(start_y), int(x), int(start_y + grid_size))
             painter.drawLine(int(start_x), int(y), int(start_x + grid_size), int(y))
         
-        # Important connections
-        if self.network.hidden_activations is not None:
-            # Find most important active pixels
-            active_inputs = np.where(self.current_input > 0.5)[0]
-            hidden_activations = self.network.hidden_activations[0]
-            top_hidden = np.argsort(hidden_activations)[-5:]  # Top 5 hidden neurons
-            
-            # Input -> hidden layer connections
-            for idx in active_inputs:
-                i, j = idx // 28, idx % 28
-                in_x = start_x + j * cell_size + cell_size/2
-                in_y = start_y + i * cell_size + cell_size/2
-                
-                for h_idx in top_hidden:
-                    hid_y = h * 0.2 + (h * 0.6 * h_idx / (self.network.hidden_size-1))
-                    weight = float(self.network.weights1[idx, h_idx])
-                    if weight > 0:
-                        color = QColor(0, 0, 255, int(abs(weight * 200)))
-                    else:
-                        color = QColor(255, 0, 0, int(abs(weight * 200)))
-                    pen = QPen(color, max(1, int(abs(weight * 3))))
-                    painter.setPen(pen)
-                    painter.drawLine(int(in_x), int(in_y), int(self.hidden_x), int(hid_y))
-            
-            # Hidden layer -> output connections
-            for h_idx in top_hidden:
-                hid_y = h * 0.2 + (h * 0.6 * h_idx / (self.network.hidden_size-1))
-                for o_idx in range(self.network.output_size):
-                    if float(self.predictions[o_idx]) > 0.1:  # Show only significant outputs
-                        out_y = h * 0.2 + (h * 0.6 * o_idx / (self.network.output_size-1))
-                        weight = float(self.network.weights2[h_idx, o_idx])
-                        if weight > 0:
-                            color = QColor(0, 0, 255, int(abs(weight * 200)))
-                        else:
-                            color = QColor(255, 0, 0, int(abs(weight * 200)))
-                        pen = QPen(color, max(1, int(abs(weight * 3))))
-                        painter.setPen(pen)
-                        painter.drawLine(int(self.hidden_x), int(hid_y), int(self.output_x), int(out_y))
+        # Saliency of the prediction over the input
+        if self.saliency_image is not None:
+            painter.drawImage(QRectF(start_x, start_y, grid_size, grid_size), self.saliency_image)
+            font = painter.font()
+            font.setPointSize(8)
+            font.setBold(False)
+            painter.setFont(font)
+            painter.setPen(QColor("#7f8c8d"))
+            painter.drawText(QRectF(start_x - 30, start_y + grid_size + 8, grid_size + 60, 30),
+                             Qt.AlignHCenter | Qt.TextWordWrap,
+                             "Orange: raises the prediction\nPurple: lowers it")
+    
+    def draw_output_bar(self, painter, i, h):
+        """Probability bar of output neuron i"""
+        y = h * 0.2 + (h * 0.6 * i / (self.network.output_size-1))
+        activation = float(self.predictions[i])
         
-        # Hidden neurons
-        if self.network.hidden_activations is not None:
-            for i in range(self.network.hidden_size):
-                y = h * 0.2 + (h * 0.6 * i / (self.network.hidden_size-1))
-                activation = float(self.network.hidden_activations[0, i])
-                color = QColor(0, 0, 255, int(activation * 255))
-                painter.setBrush(QBrush(color))
-                painter.setPen(Qt.black)
-                painter.drawEllipse(QPointF(self.hidden_x, y), self.neuron_radius/2, self.neuron_radius/2)
+        # Main rectangle
+        rect_x = self.output_x + 30
+        rect_y = y - 12
+        rect_width = 100
+        rect_height = 24
         
-        # Output neurons with enhanced visualization
-        for i in range(self.network.output_size):
-            y = h * 0.2 + (h * 0.6 * i / (self.network.output_size-1))
-            activation = float(self.predictions[i])
-            
-            # Main rectangle
-            rect_x = self.output_x + 30
-            rect_y = y - 12
-            rect_width = 100
-            rect_height = 24
+        # Create main rectangle
+        main_rect = QRectF(rect_x, rect_y, rect_width, rect_height)
+        
+        # Background with slight gradient
+        background_gradient = QLinearGradient(main_rect.topLeft(), main_rect.bottomLeft())
+        background_gradient.setColorAt(0, QColor("#f8f9fa"))
+        background_gradient.setColorAt(1, QColor("#e9ecef"))
+        painter.setBrush(background_gradient)
+        painter.setPen(QPen(QColor("#dee2e6"), 1))
+        painter.drawRoundedRect(main_rect, 4, 4)  # Rounded corners
+        
+        # Progress bar with gradient
+        if activation > 0:
+            progress_width = int(rect_width * activation)
+            progress_rect = QRectF(rect_x, rect_y, progress_width, rect_height)
             
-            # Create main rectangle
-            main_rect = QRectF(rect_x, rect_y, rect_width, rect_height)
+            # Create gradient based on activation level
+            gradient = QLinearGradient(progress_rect.topLeft(), progress_rect.bottomLeft())
             
-            # Background with slight gradient
-            background_gradient = QLinearGradient(main_rect.topLeft(), main_rect.bottomLeft())
-            background_gradient.setColorAt(0, QColor("#f8f9fa"))
-            background_gradient.setColorAt(1, QColor("#e9ecef"))
-            painter.setBrush(background_gradient)
-            painter.setPen(QPen(QColor("#dee2e6"), 1))
-            painter.drawRoundedRect(main_rect, 4, 4)  # Rounded corners
+            if activation > 0.8:
+                # Green for very high confidence
+                gradient.setColorAt(0, QColor("#00b894"))
+                gradient.setColorAt(1, QColor("#00cec9"))
+            elif activation > 0.5:
+                # Blue for medium-high confidence
+                gradient.setColorAt(0, QColor("#0984e3"))
+                gradient.setColorAt(1, QColor("#74b9ff"))
+            elif activation > 0.3:
+                # Orange for medium-low confidence
+                gradient.setColorAt(0, QColor("#fdcb6e"))
+                gradient.setColorAt(1, QColor("#ffeaa7"))
+            else:
+                # Gray for low confidence
+                gradient.setColorAt(0, QColor("#b2bec3"))
+                gradient.setColorAt(1, QColor("#dfe6e9"))
             
-            # Progress bar with gradient
-            if activation > 0:
-                progress_width = int(rect_width * activation)
-                progress_rect = QRectF(rect_x, rect_y, progress_width, rect_height)
-                
-                # Create gradient based on activation level
-                gradient = QLinearGradient(progress_rect.topLeft(), progress_rect.bottomLeft())
-                
-                if activation > 0.8:
-                    # Green for very high confidence
-                    gradient.setColorAt(0, QColor("#00b894"))
-                    gradient.setColorAt(1, QColor("#00cec9"))
-                elif activation > 0.5:
-                    # Blue for medium-high confidence
-                    gradient.setColorAt(0, QColor("#0984e3"))
-                    gradient.setColorAt(1, QColor("#74b9ff"))
-                elif activation > 0.3:
-                    # Orange for medium-low confidence
-                    gradient.setColorAt(0, QColor("#fdcb6e"))
-                    gradient.setColorAt(1, QColor("#ffeaa7"))
-                else:
-                    # Gray for low confidence
-                    gradient.setColorAt(0, QColor("#b2bec3"))
-                    gradient.setColorAt(1, QColor("#dfe6e9"))
-                
-                painter.setBrush(gradient)
-                painter.setPen(Qt.NoPen)
-                painter.drawRoundedRect(progress_rect, 4, 4)
+            painter.setBrush(gradient)
+            painter.setPen(Qt.NoPen)
+            painter.drawRoundedRect(progress_rect, 4, 4)
+        
+        # Draw digit and percentage
+        painter.setPen(Qt.black)
+        font = painter.font()
+        font.setPointSize(10)
+        font.setBold(False)
+        painter.setFont(font)
+        
+        # Digit on the left
+        digit_text = str(i)
+        painter.drawText(
+            int(rect_x - 25),
+            int(rect_y + rect_height/2 + 5),
+            digit_text
+        )
+        
+        # Percentage on the right
+        percentage = f"{int(activation * 100)}%"
+        painter.drawText(
+            int(rect_x + rect_width + 5),
+            int(rect_y + rect_height/2 + 5),
+            percentage
+        )
+    
+    def layout_regions(self, w, h):
+        """
+        Set the layer positions for a w x h widget and return the rectangles
+        of the parts of the network view that change between predictions.
+        """
+        # Horizontal layer positions
+        self.input_x = self.margin_h + 100  # More space for input
+        self.hidden_x = w // 2
+        self.output_x = w - self.margin_h - self.output_width - 50
+        
+        # Input grid, centered vertically
+        grid_size = 140
+        start_x = self.input_x - grid_size/2
+        start_y = (h - grid_size) / 2
+        
+        # Rows of the hidden and output layers span h * 0.2 .. h * 0.8
+        top, span = h * 0.2, h * 0.6
+        radius = self.neuron_radius / 2 + 2
+        outputs = []
+        for i in range(self.network.output_size):
+            y = top + span * i / (self.network.output_size - 1)
+            # Digit label, bar and percentage text
+            outputs.append(QRectF(self.output_x + 3, y - 14, w - self.output_x - 3, 28).toAlignedRect())
+        
+        return {
+            "grid": QRectF(start_x, start_y, grid_size, grid_size),
+            # Grid, shadow and saliency legend
+            "input": QRectF(start_x - 32, start_y - 2, grid_size + 64, grid_size + 42).toAlignedRect(),
+            # Input -> hidden lines, or the feature-map panel
+            "connections": QRectF(start_x - 2, 0, self.hidden_x - start_x + radius, h).toAlignedRect(),
+            "hidden": QRectF(self.hidden_x - radius, top - radius, 2 * radius, span + 2 * radius).toAlignedRect(),
+            # Hidden -> output lines (up to 3 px wide)
+            "links": QRectF(self.hidden_x - 2, top - 3, self.output_x - self.hidden_x + 4, span + 6).toAlignedRect(),
+            "outputs": outputs,
+            # Strip of segmented digits (multi-digit mode)
+            "digits": QRectF(self.margin_h, h - 80, w - 2 * self.margin_h, 76).toAlignedRect()
+        }
+    
+    def digit_rects(self, region):
+        """Thumbnail of every digit in the digits strip"""
+        size, spacing = 36, 14
+        left = region.left() + 140
+        return [QRectF(left + i * (size + spacing), region.top() + 6, size, size)
+                for i in range(len(self.digit_images))]
+    
+    def draw_digits(self, painter, region):
+        """Digits strip: the number read, and each digit with its prediction"""
+        predicted = []
+        for probabilities in self.digit_probabilities:
+            predicted.append(str(int(np.argmax(probabilities))) if probabilities.max() > 0 else "?")
+        
+        painter.setPen(Qt.black)
+        font = painter.font()
+        font.setPointSize(11)
+        font.setBold(True)
+        painter.setFont(font)
+        text = f"Number:\n{''.join(predicted)}" if predicted else "Draw digits side by side"
+        painter.drawText(QRectF(region.left(), region.top(), 130 if predicted else region.width(), region.height()),
+                         Qt.AlignLeft | Qt.AlignVCenter, text)
+        
+        font.setPointSize(9)
+        font.setBold(False)
+        painter.setFont(font)
+        painter.setBrush(Qt.NoBrush)
+        for i, rect in enumerate(self.digit_rects(region)):
+            painter.drawImage(rect, self.digit_thumbnails[i])
+            selected = i == self.selected_digit
+            painter.setPen(QPen(QColor("#3498db"), 3 if selected else 1))
+            painter.drawRect(rect)
             
-            # Draw digit and percentage
+            # Predicted digit and its probability under the thumbnail
+            confidence = int(float(self.digit_probabilities[i].max()) * 100)
             painter.setPen(Qt.black)
-            font = painter.font()
-            font.setPointSize(10)
+            painter.drawText(QRectF(rect.left() - 7, rect.bottom() + 3, rect.width() + 14, 16),
+                             Qt.AlignCenter, f"{predicted[i]} {confidence}%")
+    
+    def frame_state(self):
+        """
+        What the network view shows for the current prediction, quantized
+        the way it is drawn: changes smaller than one color or percent level
+        are invisible, so they count as no change.
+        """
+        result = self.result
+        has_activations = result is not None and result.hidden_activations is not None
+        hidden = None
+        links = None
+        if has_activations:
+            activations = result.hidden_activations[0]
+            hidden = (np.asarray(activations) * 255).astype(np.uint8)
+            # Hidden -> output lines: top hidden neurons to significant outputs
+            outputs = np.asarray(result.output_activations[0])
+            links = (tuple(np.argsort(activations)[-5:]), tuple(np.flatnonzero(outputs > 0.1)))
+        
+        # Output bars: width / percentage, and color band
+        percents = (self.predictions * 100).astype(int)
+        bands = np.searchsorted([0.0, 0.3, 0.5, 0.8], self.predictions, side='right')
+        return {
+            "snapshot": result.snapshot if result is not None else None,
+            "input": (np.clip(self.current_input, 0, 1) * 255).astype(np.uint8),
+            "saliency": self.saliency_image is not None,
+            "hidden": hidden,
+            "links": links,
+            "outputs": list(zip(percents.tolist(), bands.tolist()))
+        }
+    
+    def changed_regions(self, previous, frame):
+        """Rectangles to repaint to go from the `previous` frame to `frame`"""
+        if self.display_mode != "network":
+            # Tile views are one image: repaint all of it, unless nothing changed
+            same = (previous is not None and previous["snapshot"] is frame["snapshot"]
+                    and np.array_equal(previous["input"], frame["input"]))
+            return [] if same else [self.rect()]
+        if previous is None:
+            return [self.rect()]
+        
+        regions = self.layout_regions(self.width(), self.height())
+        same_weights = previous["snapshot"] is frame["snapshot"]
+        same_input = np.array_equal(previous["input"], frame["input"])
+        same_hidden = (previous["hidden"] is None) == (frame["hidden"] is None) and (
+            frame["hidden"] is None or np.array_equal(previous["hidden"], frame["hidden"]))
+        
+        rects = []
+        if not (same_input and same_weights and previous["saliency"] == frame["saliency"]):
+            rects.append(regions["input"])
+        if not (same_input and same_weights and (previous["hidden"] is None) == (frame["hidden"] is None)):
+            rects.append(regions["connections"])
+        if not same_hidden:
+            rects.append(regions["hidden"])
+        if not same_weights or previous["links"] != frame["links"]:
+            rects.append(regions["links"])
+        for rect, before, after in zip(regions["outputs"], previous["outputs"], frame["outputs"]):
+            if before != after:
+                rects.append(rect)
+        return rects
+    
+    def set_display_mode(self, mode):
+        """Show the network ("network") or one tile per hidden neuron ("weights", "gradients", "activations")"""
+        self.display_mode = mode
+        self.update()
+    
+    def mode_source(self, mode):
+        """Object whose replacement invalidates the render of a mode"""
+        if mode == "weights":
+            if self.result is not None:
+                return self.result.snapshot
+            return getattr(self.network, "snapshot", self.network)
+        return self.result  # Per-prediction modes
+    
+    def mode_values(self, mode, source):
+        """
+        Values of the tiles of a mode, shape (hidden_size, 784), or None if unavailable:
+        weights: weights1 columns
+        gradients: gradient of the predicted output w.r.t. weights1, x * delta
+        activations: contribution of every pixel to each hidden neuron, x * weight
+        """
+        if mode == "weights":
+            if source.weights1.shape[0] != self.current_input.size:
+                return None  # First layer reads convolution features, not pixels
+            return np.asarray(source.weights1).T
+        
+        result = source
+        if result is None or result.hidden_activations is None or result.feature_maps is not None:
+            return None
+        x = self.current_input
+        weights1 = np.asarray(result.snapshot.weights1)
+        if mode == "activations":
+            return (x[:, None] * weights1).T
+        
+        hidden = result.hidden_activations[0]
+        output = result.output_activations[0]
+        digit = int(np.argmax(output))
+        delta = (output[digit] * (1 - output[digit]) * np.asarray(result.snapshot.weights2)[:, digit]
+                 * hidden * (1 - hidden))
+        return delta[:, None] * x[None, :]
+    
+    def render_tiles(self, values):
+        """
+        Colormap all tiles in one pass and assemble them into a single image.
+        Returns (QImage, columns).
+        """
+        count = len(values)
+        columns = int(np.ceil(np.sqrt(count * 1.75)))  # Wider than tall
+        rows = (count + columns - 1) // columns
+        
+        # Each tile is scaled by its own largest magnitude; 127 is zero
+        peak = np.abs(values).max(axis=1, keepdims=True)
+        peak[peak == 0] = 1.0
+        levels = np.rint((values / peak + 1.0) * 127.0).astype(np.uint8)
+        
+        # 28x28 tiles with a one-pixel gap (level 255)
+        tiles = np.full((rows * columns, 29, 29), 255, dtype=np.uint8)
+        tiles[:count, :28, :28] = levels.reshape(count, 28, 28)
+        mosaic = tiles.reshape(rows, columns, 29, 29).transpose(0, 2, 1, 3)
+        mosaic = np.ascontiguousarray(mosaic.reshape(rows * 29, columns * 29)[:-1, :-1])
+        
+        image = QImage(mosaic.data, mosaic.shape[1], mosaic.shape[0], mosaic.shape[1], QImage.Format_Indexed8)
+        image.setColorTable(self.heatmap_colors)
+        return image.copy(), columns  # Detached from the numpy buffer
+    
+    def draw_tiles(self, painter, w, h):
+        """One heatmap tile per hidden neuron, rendered once per weights or prediction"""
+        mode = self.display_mode
+        source = self.mode_source(mode)
+        cached = self.mode_images.get(mode)
+        if cached is None or cached[0] is not source:
+            values = self.mode_values(mode, source) if source is not None else None
+            cached = (source, self.render_tiles(values) if values is not None else None)
+            self.mode_images[mode] = cached
+        
+        titles = {
+            "weights": "Hidden neuron weights (blue +, red -)",
+            "gradients": "Weight gradients for the predicted digit",
+            "activations": "Pixel contributions to each hidden neuron"
+        }
+        painter.setPen(Qt.black)
+        font = painter.font()
+        font.setPointSize(12)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.drawText(QRectF(0, 10, w, 30), Qt.AlignCenter, titles[mode])
+        
+        if cached[1] is None:
+            font.setBold(False)
             painter.setFont(font)
-            
-            # Digit on the left
-            digit_text = str(i)
-            painter.drawText(
-                int(rect_x - 25),
-                int(rect_y + rect_height/2 + 5),
-                digit_text
-            )
-            
-            # Percentage on the right
-            percentage = f"{int(activation * 100)}%"
-            painter.drawText(
-                int(rect_x + rect_width + 5),
-                int(rect_y + rect_height/2 + 5),
-                percentage
-            )
+            if mode != "weights" and (self.result is None or self.result.hidden_activations is None):
+                message = "Draw a digit to see this view"
+            else:
+                message = "Only available when the hidden layer reads the pixels directly"
+            painter.drawText(self.rect(), Qt.AlignCenter, message)
+            return
+        
+        # Scaled up without smoothing so every weight stays a visible square
+        image, columns = cached[1]
+        area_w, area_h = w - 2 * self.margin_h, h - 2 * self.margin_v - 40
+        scale = min(area_w / image.width(), area_h / image.height())
+        target = QRectF((w - image.width() * scale) / 2, self.margin_v + 40,
+                        image.width() * scale, image.height() * scale)
+        painter.drawImage(target, image)
+        
+        if mode == "activations":
+            # Activation of each hidden neuron under its tile
+            font.setBold(False)
+            font.setPointSize(8)
+            painter.setFont(font)
+            for i, activation in enumerate(self.result.hidden_activations[0]):
+                row, column = divmod(i, columns)
+                painter.drawText(int(target.left() + column * 29 * scale + 2),
+                                 int(target.top() + (row * 29 + 28) * scale - 3),
+                                 f"{activation:.2f}")
+    
+    def build_input_image(self, x):
+        """
+        28x28 image of the input grid: checkerboard background with the pixels
+        drawn over it in transparent blue, blended in one numpy pass
+        """
+        checker = (np.add.outer(np.arange(28), np.arange(28)) % 2 == 0)[..., None]
+        background = np.where(checker, (248, 249, 250), (255, 255, 255))
+        alpha = (np.clip(x, 0, 1).reshape(28, 28, 1) * 255).astype(np.uint8) / 255.0
+        rgb = np.rint(background * (1 - alpha) + np.array((52, 152, 219)) * alpha).astype(np.uint8)
+        rgb = np.ascontiguousarray(rgb)
+        image = QImage(rgb.data, 28, 28, 28 * 3, QImage.Format_RGB888)
+        return image.copy()  # Detached from the numpy buffer
+    
+    def build_saliency_image(self, input_image, result):
+        """
+        Overlay of the input gradient of the predicted digit: orange where more
+        ink would raise it, purple where it would lower it. Reuses the
+        activations of `result`, so it costs one backward product per prediction.
+        For ensembles it is the gradient of the averaged output shown by the bars.
+        """
+        if not self.show_saliency or result.hidden_activations is None:
+            return None
+        source = result.ensemble if result.ensemble is not None else result.snapshot
+        saliency = getattr(source, "saliency", None)
+        if saliency is None:
+            return None  # e.g. int8 network
+        maps = saliency(input_image, result=result)
+        peak = np.abs(maps).max()
+        if peak == 0:
+            return None
+        
+        strength = maps / peak
+        rgba = np.zeros(maps.shape + (4,), dtype=np.uint8)
+        rgba[strength > 0] = (230, 126, 34, 0)
+        rgba[strength <= 0] = (142, 68, 173, 0)
+        rgba[..., 3] = (np.abs(strength) * 160).astype(np.uint8)
+        height, width = maps.shape
+        image = QImage(rgba.data, width, height, width * 4, QImage.Format_RGBA8888)
+        return image.copy()  # Detached from the numpy buffer
+    
+    def draw_feature_maps(self, painter, h):
+        """Feature-map panel between the input grid and the hidden layer"""
+        left = self.input_x + 90
+        right = self.hidden_x - 40
+        columns = 2
+        spacing = 4
+        rows = sum((len(tiles) + columns - 1) // columns for tiles in self.feature_images)
+        tile_size = min(48, (right - left) / columns - spacing, h * 0.7 / rows - spacing)
+        if tile_size <= 0:
+            return
+        
+        painter.setPen(Qt.black)
+        painter.drawText(int(left), 30, "Feature Maps")
+        
+        y = (h - rows * (tile_size + spacing)) / 2
+        painter.setPen(QPen(QColor(222, 226, 230), 1))
+        painter.setBrush(Qt.NoBrush)
+        for tiles in self.feature_images:
+            for index, image in enumerate(tiles):
+                row, column = divmod(index, columns)
+                rect = QRectF(left + column * (tile_size + spacing),
+                              y + row * (tile_size + spacing), tile_size, tile_size)
+                painter.drawImage(rect, image)
+                painter.drawRect(rect)
+            y += ((len(tiles) + columns - 1) // columns) * (tile_size + spacing)
+    
+    def build_feature_images(self, feature_maps):
+        """One QImage per feature map, scaled to 0-255 per layer"""
+        if feature_maps is None:
+            return []
+        images = []
+        for maps in feature_maps:
+            peak = float(maps.max())
+            scale = 255.0 / peak if peak > 0 else 0.0
+            levels = (maps * scale).astype(np.uint8)
+            tiles = np.ascontiguousarray(np.moveaxis(levels, -1, 0))  # (filters, height, width)
+            layer_images = []
+            for tile in tiles:
+                image = QImage(tile.data, tile.shape[1], tile.shape[0], tile.shape[1], QImage.Format_Indexed8)
+                image.setColorTable(self.feature_colors)
+                layer_images.append(image.copy())  # Detached from the numpy buffer
+            images.append(layer_images)
+        return images
     
-    def update_predictions(self, input_image, predictions):
-        """Update the network visualization with new predictions"""
+    def compute_connection_lines(self, weights1, start_x, start_y, cell_size, h):
+        """
+        Selects the top-K input -> hidden contributions (input * weight)
+        and returns their lines grouped by (positive, magnitude level).
+        """
+        active_inputs = np.flatnonzero(self.current_input > 0)
+        if active_inputs.size == 0:
+            return {}
+        
+        # Contribution of every active pixel to every hidden neuron
+        contributions = self.current_input[active_inputs, None] * weights1[active_inputs]
+        flat = contributions.ravel()
+        k = min(self.max_connection_lines, flat.size)
+        magnitudes = np.abs(flat)
+        if k < flat.size:
+            top = np.argpartition(magnitudes, flat.size - k)[flat.size - k:]
+        else:
+            top = np.arange(flat.size)
+        top = top[magnitudes[top] > 0]
+        if top.size == 0:
+            return {}
+        
+        input_idx = active_inputs[top // contributions.shape[1]]
+        hidden_idx = top % contributions.shape[1]
+        values = flat[top]
+        
+        # Line endpoints
+        in_x = start_x + (input_idx % 28) * cell_size + cell_size / 2
+        in_y = start_y + (input_idx // 28) * cell_size + cell_size / 2
+        hid_y = h * 0.2 + (h * 0.6 * hidden_idx / (self.network.hidden_size - 1))
+        
+        # Magnitude level relative to the strongest selected contribution
+        strength = np.abs(values) / np.abs(values).max()
+        levels = np.minimum((strength * self.connection_levels).astype(int), self.connection_levels - 1)
+        positive = values > 0
+        
+        buckets = {}
+        for bucket_positive in (True, False):
+            for level in range(self.connection_levels):
+                mask = (positive == bucket_positive) & (levels == level)
+                if not mask.any():
+                    continue
+                buckets[(bucket_positive, level)] = [
+                    QLineF(x1, y1, self.hidden_x, y2)
+                    for x1, y1, y2 in zip(in_x[mask].tolist(), in_y[mask].tolist(), hid_y[mask].tolist())
+                ]
+        return buckets
+    
+    def update_predictions(self, input_image, result):
+        """Update the network visualization with a new InferenceResult"""
         self.current_input = input_image.flatten()
-        self.predictions = predictions.flatten()
+        self.input_image = self.build_input_image(self.current_input)
+        self.result = result
+        self.predictions = result.probabilities.flatten()
+        self.feature_images = self.build_feature_images(result.feature_maps)
+        self.saliency_image = self.build_saliency_image(input_image, result)
         
         # Update prediction history
-        for i, pred in enumerate(predictions):
-            self.prediction_history[i].append(float(pred))
-            if len(self.prediction_history[i]) > self.max_history_size:
-                self.prediction_history[i].pop(0)
+        self.prediction_history.append(self.predictions)
+        
+        # Repaint only what changed since the last prediction (often just a few bars)
+        previous, self.frame = self.frame, self.frame_state()
+        for rect in self.changed_regions(previous, self.frame):
+            self.update(rect)
+    
+    def update_digits(self, images, probabilities=None, selected=0):
+        """
+        Show the digits of a multi-digit drawing, images (n, 28, 28) with their
+        probabilities (n, 10); `selected` is the one shown in the network view.
+        None hides the strip. Only repaints the strip when what it shows changed.
+        """
+        state = None
+        if images is not None:
+            state = ((np.clip(images, 0, 1) * 255).astype(np.uint8).tobytes(),
+                     (probabilities * 100).astype(int).tobytes(), selected)
+        if state == self.digits_state:
+            return
         
-        self.update() 
\ No newline at end of file
+        self.digits_state = state
+        self.digit_images = images
+        self.digit_probabilities = probabilities
+        self.selected_digit = selected
+        self.digit_thumbnails = [self.build_input_image(image) for image in images] if images is not None else []
+        self.update(self.layout_regions(self.width(), self.height())["digits"])
+    
+    def mousePressEvent(self, event):
+        """Clicking a digit of the strip selects it (digit_selected)"""
+        if self.display_mode == "network" and self.digit_images is not None:
+            region = self.layout_regions(self.width(), self.height())["digits"]
+            for i, rect in enumerate(self.digit_rects(region)):
+                if rect.contains(QPointF(event.pos())):
+                    self.digit_selected.emit(i)
+                    return
+        super().mousePressEvent(event)
+    
+    def get_prediction_history(self, digit=None):
+        """
+        Returns the prediction history in time order (oldest first).
+        Shape is (n_updates, 10), or (n_updates,) for a single digit.
+        The result is a read-only view, not a copy.
+        """
+        history = self.prediction_history.view()
+        if digit is not None:
+            return history[:, digit]
+        return history 
\ No newline at end of file
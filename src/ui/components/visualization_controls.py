@@ -1,7 +1,10 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 
 class VisualizationControls(QWidget):
+    # Display mode of the NetworkVisualizer: "network", "weights", "gradients" or "activations"
+    mode_changed = pyqtSignal(str)
+    
     def __init__(self):
         super().__init__()
         layout = QVBoxLayout(self)
@@ -17,8 +20,15 @@ class VisualizationControls(QWidget):
         self.weights_btn = QPushButton("Weights")
         self.gradients_btn = QPushButton("Gradients")
         self.activations_btn = QPushButton("Activations")
+        self.mode = "network"
+        self.mode_buttons = {
+            "weights": self.weights_btn,
+            "gradients": self.gradients_btn,
+            "activations": self.activations_btn
+        }
         
-        for btn in [self.weights_btn, self.gradients_btn, self.activations_btn]:
+        for mode, btn in self.mode_buttons.items():
+            btn.setCheckable(True)
             btn.setStyleSheet("""
                 QPushButton {
                     background-color: #4CAF50;
@@ -30,7 +40,18 @@ class VisualizationControls(QWidget):
                 QPushButton:hover {
                     background-color: #45a049;
                 }
+                QPushButton:checked {
+                    background-color: #2c3e50;
+                }
             """)
+            btn.clicked.connect(lambda checked, m=mode: self.select_mode(m))
             buttons_layout.addWidget(btn)
         
-        layout.addLayout(buttons_layout) 
\ No newline at end of file
+        layout.addLayout(buttons_layout) 
+    
+    def select_mode(self, mode):
+        """Switch to a mode; selecting the current mode again returns to the network view"""
+        self.mode = "network" if mode == self.mode else mode
+        for name, btn in self.mode_buttons.items():
+            btn.setChecked(name == self.mode)
+        self.mode_changed.emit(self.mode)
@@ -4,27 +4,66 @@ Contains the main UI layout and initialization.
 """
 
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, 
-                           QVBoxLayout, QProgressDialog, QLabel, 
+                           QVBoxLayout, QProgressBar, QLabel, 
                            QFrame, QPushButton)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import os
 import sys
+import numpy as np
 
 from src.ui.components.drawing_panel import DrawingPanel
 from src.ui.components.network_visualizer import NetworkVisualizer
+from src.ui.components.correction_panel import CorrectionPanel
+from src.ui.components.visualization_controls import VisualizationControls
+from src.ui.components.dataset_panel import DatasetPanel
 from src.core.neural_network import SimpleNeuralNetwork
-from src.core.dataset_loader import DatasetLoader
+from src.core.ensemble import EnsembleNetwork
+from src.core.quantization import evaluate_quantization
+from src.core.inference_session import InferenceSession
+from src.core.trainer import TrainingController
+from src.core.online_learning import OnlineLearner
+from src.core.embedding_index import EmbeddingIndex
+from src.core.dataset_loader import get_dataset_loader
 from src.ui.styles.style_constants import *
 from src.utils.config import *
+from src.utils import startup
+
+class BackgroundTask(QThread):
+    """
+    Runs function(task) outside the GUI thread.
+    The function reports with task.progress.emit(done, total, message) and
+    should return early once task.isInterruptionRequested() is True.
+    """
+    progress = pyqtSignal(int, int, str)
+    
+    def __init__(self, function, parent=None):
+        super().__init__(parent)
+        self.function = function
+        self.result = None
+        self.error = None
+    
+    def run(self):
+        try:
+            self.result = self.function(self)
+        except Exception as e:
+            self.error = e
 
 class DigitRecognitionApp(QMainWindow):
+    # New snapshot from the online learner (emitted from its worker thread)
+    network_updated = pyqtSignal(object)
+    # Weights and metrics published during training (emitted from the training thread)
+    training_snapshot = pyqtSignal(object, object)
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("NeuroDraw - Neural Network Digit Recognition")
-        self.showFullScreen()
         self.init_network()
         self.init_ui()
         self.drawing_panel.canvas.image_updated.connect(self.update_prediction)
+        self.correction_panel.digit_selected.connect(self.add_correction)
+        self.network_viz.digit_selected.connect(self.select_digit)
+        self.network_updated.connect(self.apply_network_update)
+        self.training_snapshot.connect(self.show_training_snapshot)
     
     def init_ui(self):
         """Initialize the user interface"""
@@ -39,8 +78,20 @@ class DigitRecognitionApp(QMainWindow):
         quit_button.setStyleSheet(CLOSE_BUTTON_STYLE)
         quit_button.clicked.connect(self.close)
         
-        # Top layout for close button
+        # Top layout for training status and close button
         top_layout = QHBoxLayout()
+        
+        self.training_status = QLabel("Loading dataset...")
+        self.training_status.setStyleSheet(DESCRIPTION_STYLE)
+        self.training_progress = QProgressBar()
+        self.training_progress.setRange(0, 0)  # Busy until the first batch
+        self.training_progress.setMaximumWidth(300)
+        self.stop_training_button = QPushButton("Stop training")
+        self.stop_training_button.clicked.connect(self.stop_training)
+        top_layout.addWidget(self.training_status)
+        top_layout.addWidget(self.training_progress)
+        top_layout.addWidget(self.stop_training_button)
+        
         top_layout.addStretch()
         top_layout.addWidget(quit_button)
         main_layout.addLayout(top_layout)
@@ -81,7 +132,7 @@ class DigitRecognitionApp(QMainWindow):
         title.setStyleSheet(TITLE_STYLE)
         
         description = QLabel(
-            "Draw a digit (0-9)\n"
+            "Draw a digit (0-9), or a number in multi-digit mode\n"
             "Real-time recognition"
         )
         description.setStyleSheet(DESCRIPTION_STYLE)
@@ -95,13 +146,22 @@ class DigitRecognitionApp(QMainWindow):
         self.drawing_panel = DrawingPanel()
         layout.addWidget(self.drawing_panel)
         
+        # Corrections for online learning
+        self.correction_panel = CorrectionPanel()
+        layout.addWidget(self.correction_panel)
+        
+        # Training digits the network finds closest to the drawing
+        self.dataset_panel = DatasetPanel(show_examples=False)
+        layout.addWidget(self.dataset_panel)
+        
         # Drawing help
         drawing_help = QLabel(
             "Tips:\n"
             "• Grid = Size guide\n"
             "• Draw clearly\n"
             "• Undo/Redo available\n"
-            "• Clear to reset"
+            "• Clear to reset\n"
+            "• Multi-digit: leave a gap between digits"
         )
         drawing_help.setStyleSheet(TIPS_STYLE)
         layout.addWidget(drawing_help)
@@ -134,8 +194,13 @@ class DigitRecognitionApp(QMainWindow):
         viz_header_layout.addWidget(description)
         layout.addWidget(viz_header)
         
+        # Display modes
+        self.visualization_controls = VisualizationControls()
+        layout.addWidget(self.visualization_controls)
+        
         # Network visualization
-        self.network_viz = NetworkVisualizer(self.network)
+        self.network_viz = NetworkVisualizer(self.inference_network)
+        self.visualization_controls.mode_changed.connect(self.network_viz.set_display_mode)
         layout.addWidget(self.network_viz)
         
         # Probability legend
@@ -157,53 +222,254 @@ class DigitRecognitionApp(QMainWindow):
         return panel
     
     def init_network(self):
-        """Initialize and train the neural network"""
-        self.network = SimpleNeuralNetwork()
+        """Create the (untrained) network; it is trained by start_training()"""
+        if NETWORK_CONFIG["ensemble_size"] > 1 and not NETWORK_CONFIG["conv_layers"]:
+            self.network = EnsembleNetwork()
+        else:
+            if NETWORK_CONFIG["ensemble_size"] > 1:
+                print("Ensembles only support dense networks, training a single network")
+            self.network = SimpleNeuralNetwork()
+        self.inference_network = self.network  # Network used for predictions
+        self.inference_session = InferenceSession(self.network)
+        self.dataset_loader = None
+        self.online_learner = None  # Created once training is over
+        self.embedding_index = None  # Hidden embeddings of the training set, after training
+        self.embedding_task = None  # Rebuilds the embeddings after an online update
+        self.selected_digit = None  # Digit shown in detail in multi-digit mode, None = the last one
+        self.training_task = None
+    
+    def start_training(self):
+        """Load the dataset and train the network in the background"""
+        self.training_task = BackgroundTask(self.load_and_train, self)
+        self.training_task.progress.connect(self.show_training_progress)
+        self.training_task.finished.connect(self.finish_training)
+        self.training_task.start()
+    
+    def stop_training(self):
+        """Keep the weights trained so far"""
+        if self.training_task is not None:
+            self.training_task.requestInterruption()
+    
+    def show_training_progress(self, done, total, message):
+        self.training_status.setText(message)
+        if total > 0:
+            self.training_progress.setRange(0, total)
+            self.training_progress.setValue(done)
+    
+    def load_and_train(self, task):
+        """Background part of the startup: dataset, training, saving, quantization"""
+        task.progress.emit(0, 0, "Loading dataset...")
+        dataset_loader = get_dataset_loader(DATA_DIR)
+        dataset_loader.train_images  # Maps (or first builds) the cached training split
+        startup.mark("Dataset loaded")
         
-        try:
-            self.dataset_loader = DatasetLoader(DATA_DIR)
-            self.train_network()
-        except Exception as e:
-            print(f"Error during initialization: {e}")
+        self.train_network(dataset_loader, task)
+        startup.mark("Network trained")
+        
+        quantized = None
+        if NETWORK_CONFIG["quantized_inference"] and self.network.conv_layers:
+            print("Int8 inference is not available with convolution layers, using float weights")
+        elif NETWORK_CONFIG["quantized_inference"] and isinstance(self.network, EnsembleNetwork):
+            print("Int8 inference is not available for ensembles, using float weights")
+        elif NETWORK_CONFIG["quantized_inference"]:
+            task.progress.emit(0, 0, "Quantizing network...")
+            quantized = self.quantize_network(dataset_loader)
+        
+        task.progress.emit(0, 0, "Embedding training images...")
+        embedding_index = EmbeddingIndex(dataset_loader.train_images)
+        embedding_index.rebuild(self.embedding_snapshot())
+        return dataset_loader, quantized, embedding_index
+    
+    def finish_training(self):
+        """Back in the GUI thread: switch to the trained network and start online learning"""
+        task = self.training_task
+        rehearsal_data = None  # Training set replayed during online learning
+        if task.error is not None:
+            print(f"Error during initialization: {task.error}")
+        else:
+            self.dataset_loader, quantized, self.embedding_index = task.result
+            rehearsal_data = self.dataset_loader
+            if quantized is not None:
+                self.inference_network = quantized
+                self.network_viz.network = quantized
+        
+        self.online_learner = OnlineLearner(self.network, rehearsal_data,
+                                            on_update=self.network_updated.emit)
+        for widget in (self.training_status, self.training_progress, self.stop_training_button):
+            widget.hide()
+        self.update_prediction(self.drawing_panel.canvas.get_normalized_image())
+        startup.mark("Ready")
+        startup.report()
     
-    def train_network(self):
-        """Train the neural network"""
+    def quantize_network(self, dataset_loader):
+        """Return an int8 copy of the trained network, after comparing it with the float one"""
+        results = evaluate_quantization(self.network, dataset_loader.test_images,
+                                        dataset_loader.test_labels)
+        print(f"Float accuracy: {results['float_accuracy']:.2%} "
+              f"({results['float_ms_per_image']:.4f} ms/image, {results['float_bytes']} bytes)")
+        print(f"Int8 accuracy: {results['int8_accuracy']:.2%} "
+              f"({results['int8_ms_per_image']:.4f} ms/image, {results['int8_bytes']} bytes)")
+        print(f"Prediction agreement: {results['agreement']:.2%}")
+        return self.network.quantize()
+    
+    def train_network(self, dataset_loader, task):
+        """Train the neural network (runs in the background task)"""
         print("Training network...")
-        epochs = TRAINING_CONFIG["epochs"]
-        batch_size = TRAINING_CONFIG["batch_size"]
-        n_samples = len(self.dataset_loader.train_images)
-        total_batches = (n_samples * epochs) // batch_size
-        
-        progress = QProgressDialog("Training network...", "Cancel", 0, total_batches, self)
-        progress.setWindowModality(Qt.WindowModal)
-        batch_count = 0
-        
-        for epoch in range(epochs):
-            total_error = 0
-            for i in range(0, n_samples, batch_size):
-                if progress.wasCanceled():
-                    break
-                    
-                batch_images = self.dataset_loader.train_images[i:i+batch_size]
-                batch_labels = self.dataset_loader.train_labels[i:i+batch_size]
-                
-                for img, label in zip(batch_images, batch_labels):
-                    error = self.network.train(img, label)
-                    total_error += error
-                
-                batch_count += 1
-                progress.setValue(batch_count)
-                
-                if i % 1000 == 0:
-                    print(f"Epoch {epoch+1}/{epochs}, Batch {i//batch_size}, Error: {total_error/(i+1):.4f}")
-        
-        progress.close()
+        
+        live_metrics = {}  # Latest metrics of the live snapshots
+        
+        def report_progress(done, total):
+            # Throttled to about one signal per percent
+            if done == total or done % max(1, total // 100) == 0:
+                message = "Training network..."
+                if live_metrics:
+                    message = (f"Training network... epoch {live_metrics['epoch']}, "
+                               f"loss {live_metrics['loss']:.4f}")
+                task.progress.emit(done, total, message)
+        
+        def report_snapshot(snapshot, metrics):
+            live_metrics.update(metrics)
+            self.training_snapshot.emit(snapshot, metrics)
+        
+        controller = TrainingController(
+            self.network,
+            dataset_loader.train_images,
+            dataset_loader.train_labels,
+            progress_callback=report_progress,
+            should_stop=task.isInterruptionRequested,
+            snapshot_callback=report_snapshot if TRAINING_CONFIG["live_snapshots"] else None
+        )
+        controller.run()
+        self.network.publish()
         print("Training completed!")
+        
+        # Saved for the headless tools (inference server, bulk scoring)
+        try:
+            self.network.save(MODEL_PATH)
+        except OSError as e:
+            print(f"Could not save the model: {e}")
+    
+    def show_training_snapshot(self, snapshot, metrics):
+        """Refresh the visualizer with weights published during training"""
+        if self.online_learner is not None or snapshot is not self.network.snapshot:
+            return  # Training is over, or newer weights are already published
+        self.update_prediction(self.drawing_panel.canvas.get_normalized_image())
     
     def update_prediction(self, normalized_image):
         """Update network predictions based on drawn image"""
-        predictions = self.network.forward(normalized_image)
-        self.network_viz.update_predictions(normalized_image, predictions)
+        if normalized_image.ndim == 3:
+            # Multi-digit drawing, one image per digit
+            normalized_image = self.update_digits(normalized_image)
+        else:
+            self.network_viz.update_digits(None)
+        
+        if self.inference_network is self.network:
+            # Only the pixels changed since the last update are recomputed
+            result = self.inference_session.infer(normalized_image)
+        else:
+            result = self.inference_network.infer(normalized_image)
+        self.network_viz.update_predictions(normalized_image, result)
+        self.update_neighbors(normalized_image, result)
+    
+    def update_digits(self, images):
+        """
+        Classify every digit of a multi-digit drawing in one batched forward
+        pass and show them; returns the image of the digit shown in detail.
+        """
+        if len(images) == 0:
+            self.selected_digit = None
+            self.network_viz.update_digits(images, np.zeros((0, 10)))
+            return np.zeros((28, 28), dtype=np.float32)
+        
+        probabilities = self.inference_network.forward_batch(images)
+        selected = len(images) - 1 if self.selected_digit is None else min(self.selected_digit, len(images) - 1)
+        self.network_viz.update_digits(images, probabilities, selected)
+        return images[selected]
+    
+    def select_digit(self, index):
+        """Show another digit of a multi-digit drawing in the network view"""
+        self.selected_digit = index
+        self.update_prediction(self.drawing_panel.canvas.get_normalized_image())
+    
+    def update_neighbors(self, normalized_image, result):
+        """Show the training images whose hidden activations are closest to the drawing's"""
+        if self.embedding_index is None:
+            return
+        if result.hidden_activations is None:
+            self.dataset_panel.show_neighbors([], [])
+            return
+        # The index uses float weights (of the first member for ensembles),
+        # the previous ones while it is rebuilt: other activations are recomputed with them
+        embedding = result.hidden_activations
+        if result.snapshot is not self.embedding_index.snapshot:
+            embedding = self.embedding_index.embed(normalized_image)
+        indices, _ = self.embedding_index.query(embedding)
+        self.dataset_panel.show_neighbors(self.dataset_loader.train_images[indices],
+                                          self.dataset_loader.train_labels[indices])
+    
+    def add_correction(self, digit):
+        """Send the current drawing with its correct digit to the online learner"""
+        if self.online_learner is None:
+            self.correction_panel.set_status("The network is still training")
+            return
+        image = self.drawing_panel.canvas.get_normalized_image()
+        if image.ndim == 3:
+            # Multi-digit drawing: the digit shown in the network view
+            image = image[self.network_viz.selected_digit] if len(image) else np.zeros((28, 28))
+        if not np.any(image):
+            self.correction_panel.set_status("Draw a digit first")
+            return
+        self.online_learner.add_correction(image, digit)
+        self.correction_panel.set_status(f"Learning this drawing as {digit}...")
+    
+    def apply_network_update(self, snapshot):
+        """Install weights from the online learner (in the GUI thread) and refresh predictions"""
+        self.network.publish(snapshot)
+        if self.inference_network is not self.network:
+            self.inference_network = self.network.quantize()
+            self.network_viz.network = self.inference_network
+        self.correction_panel.set_status("Network updated")
+        self.update_prediction(self.drawing_panel.canvas.get_normalized_image())
+        self.rebuild_embeddings()
+    
+    def embedding_snapshot(self):
+        """Float weights the neighbours are searched with (the first member of an ensemble)"""
+        snapshot = self.network.snapshot
+        return snapshot.members[0] if isinstance(self.network, EnsembleNetwork) else snapshot
+    
+    def rebuild_embeddings(self):
+        """Embed the training images with the current weights in the background"""
+        if self.embedding_index is None or self.embedding_task is not None:
+            return  # finish_embeddings() starts again if the weights changed meanwhile
+        snapshot = self.embedding_snapshot()
+        if snapshot is self.embedding_index.snapshot:
+            return
+        self.embedding_task = BackgroundTask(lambda task: self.embedding_index.build(snapshot), self)
+        self.embedding_task.finished.connect(self.finish_embeddings)
+        self.embedding_task.start()
+    
+    def finish_embeddings(self):
+        """Back in the GUI thread: swap in the new embeddings"""
+        task, self.embedding_task = self.embedding_task, None
+        if task.error is not None:
+            print(f"Could not rebuild the embeddings: {task.error}")
+            return
+        self.embedding_index.install(task.result)
+        self.rebuild_embeddings()
+        self.update_prediction(self.drawing_panel.canvas.get_normalized_image())
+    
+    def closeEvent(self, event):
+        """Stop the background training and learner with the window"""
+        if self.training_task is not None and self.training_task.isRunning():
+            self.training_task.finished.disconnect(self.finish_training)
+            self.training_task.requestInterruption()
+            self.training_task.wait()
+        if self.embedding_task is not None and self.embedding_task.isRunning():
+            self.embedding_task.finished.disconnect(self.finish_embeddings)
+            self.embedding_task.wait()
+        if self.online_learner is not None:
+            self.online_learner.stop()
+        super().closeEvent(event)
     
     def toggleFullScreen(self):
         """Toggle fullscreen mode"""
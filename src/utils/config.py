@@ -10,20 +10,58 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 DATA_DIR = os.path.join(BASE_DIR, "data")
 TRAIN_DATA_DIR = os.path.join(DATA_DIR, "train")
 TEST_DATA_DIR = os.path.join(DATA_DIR, "testing")
+MODEL_PATH = os.path.join(BASE_DIR, "models", "network.npz")  # Saved after training
 
 # Neural Network Configuration
 NETWORK_CONFIG = {
     "input_size": 784,  # 28x28 pixels
     "hidden_size": 28,
     "output_size": 10,  # 10 digits (0-9)
-    "learning_rate": 0.1
+    "learning_rate": 0.1,
+    "quantized_inference": False,  # Predict with an int8 copy of the trained network
+    # Sparse input path: only the rows of weights1 for non-zero pixels are used
+    # when the drawing is sparse enough and the hidden layer wide enough for the
+    # gather to beat the dense product (measured crossover: ~64 hidden neurons)
+    "sparse_input_density": 0.15,
+    "sparse_min_hidden_size": 64,
+    "incremental_refresh_interval": 50,  # Full hidden-layer recomputation every N canvas updates
+    # Convolution + max pooling layers in front of the hidden layer, e.g.
+    # [{"filters": 8, "kernel_size": 5, "pool_size": 2}]; empty = dense only
+    "conv_layers": [],
+    # Dense networks trained together whose probabilities are averaged (1 = single network)
+    "ensemble_size": 1
 }
 
 # Training Parameters
 TRAINING_CONFIG = {
     "epochs": 5,
     "batch_size": 32,
-    "validation_split": 0.2
+    "validation_split": 0.2,
+    "patience": 2,  # Epochs without validation improvement before stopping
+    "min_delta": 0.001,  # Smallest validation loss decrease counted as improvement
+    "restore_best": True,  # Keep the weights of the best validation epoch
+    # Weights shown in the visualizer while training: published every N batches,
+    # at most `snapshot_rate` times per second
+    "live_snapshots": True,
+    "snapshot_interval": 20,
+    "snapshot_rate": 10
+}
+
+# Online Learning Configuration (fine-tuning from user corrections)
+ONLINE_LEARNING_CONFIG = {
+    "buffer_size": 256,  # Corrections kept for replay
+    "batch_size": 16,
+    "correction_fraction": 0.25,  # Share of each batch taken from corrections
+    "updates_per_correction": 10,  # Mini-batches trained per new correction
+    "learning_rate": 0.05
+}
+
+# Local Inference Server Configuration
+SERVER_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "batch_window_ms": 5,  # How long a request may wait for others to share its batch
+    "max_batch_size": 64
 }
 
 # UI Configuration
@@ -33,11 +71,27 @@ UI_CONFIG = {
     "line_width": 2
 }
 
+# Dataset Panel Configuration
+DATASET_CONFIG = {
+    "thumbnail_size": 48,  # Size of each example thumbnail in pixels
+    "examples_per_digit": 6,
+    "neighbors": 6,  # Similar training digits shown for a drawing
+    "embedding_block_size": 8192  # Training embeddings scanned per matrix product
+}
+
 # Drawing Configuration
 DRAWING_CONFIG = {
     "brush_sizes": [2, 5, 10, 15],
     "default_brush_size": 10,
-    "default_color": "#000000"
+    "default_color": "#000000",
+    # Strokes are simplified while drawn: points may move them by at most this
+    # fraction of a 28x28 cell, checked over at most simplify_window raw points
+    "simplify_tolerance": 0.25,
+    "simplify_window": 64,
+    # Multi-digit mode: canvas width (same 10 px cells) and the smallest
+    # component, in raster pixels, read as a digit rather than noise
+    "multi_digit_width": 700,
+    "min_digit_pixels": 6
 }
 
 # Visualization Configuration
@@ -46,5 +100,8 @@ VISUALIZATION_CONFIG = {
     "animation_speed": 500,  # ms
     "node_size": 10,
     "edge_width": 1,
-    "max_history_size": 1000  # Maximum number of prediction history points to keep
+    "max_history_size": 1000,  # Maximum number of prediction history points to keep
+    "max_connection_lines": 200,  # Input -> hidden lines drawn per frame
+    "connection_levels": 4,  # Pen strength levels used for connection lines
+    "show_saliency": True  # Overlay the input gradient of the predicted digit on the input grid
 } 
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Fixed-size ring buffer backed by a preallocated numpy array.
+Used to keep bounded histories (predictions, metrics) without reallocating.
+"""
+
+import numpy as np
+
+class RingBuffer:
+    """
+    Ring buffer of fixed-width float rows.
+
+    Every row is written twice, at ``pos`` and ``pos + capacity``, so the last
+    ``len(self)`` rows are always available as one contiguous slice. Reading
+    the history in time order therefore never copies.
+    """
+    def __init__(self, capacity, width, dtype=np.float32):
+        self.capacity = max(1, int(capacity))
+        self.width = width
+        self._data = np.zeros((2 * self.capacity, width), dtype=dtype)
+        self._pos = 0    # Next slot to write, in [0, capacity)
+        self._count = 0  # Number of valid rows
+
+    def __len__(self):
+        return self._count
+
+    def append(self, row):
+        """Adds one row, overwriting the oldest one when full"""
+        self._data[[self._pos, self._pos + self.capacity]] = row
+        self._pos = (self._pos + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def clear(self):
+        """Forgets all rows (the storage is kept)"""
+        self._pos = 0
+        self._count = 0
+
+    def view(self):
+        """Returns the rows in time order (oldest first) as a read-only view"""
+        end = self._pos + self.capacity
+        rows = self._data[end - self._count:end]
+        rows.flags.writeable = False
+        return rows
+
+    def latest(self):
+        """Returns the most recent row, or None if the buffer is empty"""
+        if self._count == 0:
+            return None
+        return self._data[self._pos + self.capacity - 1]
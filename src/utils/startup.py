@@ -0,0 +1,60 @@
+"""
+Startup timing report.
+Records when the main startup phases complete and, once enabled, how long
+each module took to import (cumulative, like python -X importtime).
+"""
+
+import builtins
+import sys
+import time
+
+# Reference time of the report (this module is imported first by main.py)
+PROCESS_START = time.perf_counter()
+
+_enabled = False
+_marks = []         # (phase, seconds since start)
+_import_times = {}  # module -> cumulative import seconds
+_original_import = builtins.__import__
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """__import__ that records the first (real) import of every absolute module"""
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _import_times.setdefault(name, time.perf_counter() - start)
+
+
+def enable():
+    """Start recording; call before the heavy imports"""
+    global _enabled
+    _enabled = True
+    builtins.__import__ = _timed_import
+
+
+def is_enabled():
+    return _enabled
+
+
+def mark(phase):
+    """Record that a startup phase has completed"""
+    if _enabled:
+        _marks.append((phase, time.perf_counter() - PROCESS_START))
+
+
+def report(top=15):
+    """Print the phases and the slowest imports, then stop recording imports"""
+    if not _enabled:
+        return
+    builtins.__import__ = _original_import
+
+    print("Startup report")
+    for phase, seconds in _marks:
+        print(f"  {seconds * 1000:8.1f} ms  {phase}")
+    print(f"Slowest imports (cumulative, top {top}):")
+    slowest = sorted(_import_times.items(), key=lambda item: item[1], reverse=True)
+    for name, seconds in slowest[:top]:
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
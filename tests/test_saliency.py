@@ -0,0 +1,96 @@
+"""
+Tests of ModelSnapshot.saliency: batches, cached results and the gradient itself.
+"""
+
+import numpy as np
+import pytest
+from src.core.neural_network import SimpleNeuralNetwork
+from src.core.ensemble import EnsembleNetwork
+
+
+def make_images(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n, 28, 28)) > 0.7).astype(np.float32)
+
+
+def test_batch_matches_single_images():
+    snapshot = SimpleNeuralNetwork().snapshot
+    images = make_images(4)
+    maps = snapshot.saliency(images)
+    assert maps.shape == (4, 28, 28)
+    for image, expected in zip(images, maps):
+        np.testing.assert_allclose(snapshot.saliency(image), expected, rtol=1e-5, atol=1e-8)
+
+
+def test_batch_with_one_digit_per_image():
+    snapshot = SimpleNeuralNetwork().snapshot
+    images = make_images(3, seed=1)
+    digits = [2, 5, 7]
+    maps = snapshot.saliency(images, digit=digits)
+    for image, digit, expected in zip(images, digits, maps):
+        np.testing.assert_allclose(snapshot.saliency(image, digit), expected, rtol=1e-5, atol=1e-8)
+
+
+def test_batch_with_result_raises():
+    snapshot = SimpleNeuralNetwork().snapshot
+    images = make_images(2)
+    result = snapshot.infer(images[0])
+    with pytest.raises(ValueError):
+        snapshot.saliency(images, result=result)
+
+
+def test_result_of_single_image_is_reused():
+    snapshot = SimpleNeuralNetwork().snapshot
+    image = make_images(1)[0]
+    np.testing.assert_allclose(snapshot.saliency(image, result=snapshot.infer(image)),
+                               snapshot.saliency(image), rtol=1e-5, atol=1e-8)
+
+
+def test_matches_finite_differences():
+    snapshot = SimpleNeuralNetwork().snapshot
+    image = make_images(1)[0].astype(np.float64)
+    digit = int(np.argmax(snapshot.infer(image).probabilities))
+    maps = snapshot.saliency(image, digit)
+
+    def output(x):
+        hidden = snapshot.sigmoid(np.dot(x.ravel(), snapshot.weights1) + snapshot.bias1)
+        return snapshot.sigmoid(np.dot(hidden, snapshot.weights2) + snapshot.bias2)[0, digit]
+
+    step = 1e-4
+    for row, column in [(3, 4), (14, 14), (20, 9)]:
+        shifted = image.copy()
+        shifted[row, column] += step
+        numeric = (output(shifted) - output(image)) / step
+        assert maps[row, column] == pytest.approx(numeric, rel=1e-2, abs=1e-6)
+
+
+def test_batch_activations_are_reused():
+    snapshot = SimpleNeuralNetwork().snapshot
+    images = make_images(5, seed=2)
+    hidden = snapshot.hidden_batch(images)
+    output = snapshot.sigmoid(np.dot(hidden, snapshot.weights2) + snapshot.bias2)
+    expected = snapshot.saliency(images)
+    np.testing.assert_allclose(snapshot.saliency(images, activations=(hidden, output)), expected,
+                               rtol=1e-5, atol=1e-8)
+    np.testing.assert_allclose(snapshot.saliency(images, activations=(hidden, None)), expected,
+                               rtol=1e-5, atol=1e-8)
+
+
+def test_batch_activations_skip_the_forward_pass():
+    snapshot = SimpleNeuralNetwork().snapshot
+    images = make_images(3, seed=3)
+    hidden = snapshot.hidden_batch(images)
+    # Activations of other images: the maps follow them, not the pixels
+    other = snapshot.hidden_batch(make_images(3, seed=4))
+    assert not np.allclose(snapshot.saliency(images, activations=(other, None)),
+                           snapshot.saliency(images, activations=(hidden, None)))
+
+
+def test_ensemble_explains_the_averaged_output():
+    snapshot = EnsembleNetwork(ensemble_size=3, hidden_size=16).snapshot
+    images = make_images(4, seed=5)
+    digits = np.argmax(snapshot.forward_batch(images), axis=1)
+    expected = np.mean([member.saliency(images, digits) for member in snapshot.members], axis=0)
+    np.testing.assert_allclose(snapshot.saliency(images), expected, rtol=1e-4, atol=1e-7)
+    np.testing.assert_allclose(snapshot.saliency(images[0], result=snapshot.infer(images[0])),
+                               expected[0], rtol=1e-4, atol=1e-7)